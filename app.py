@@ -1,17 +1,27 @@
 import os
+import io
+import gzip
+import json
+import math
+import mimetypes
+import zipfile
 import uuid
 import logging
-from flask import Flask, render_template, request, send_file, jsonify
+import sqlite3
+import shutil
+from flask import Flask, render_template, request, send_file, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from pathlib import Path
 import threading
 import time
 from datetime import datetime
-from collections import defaultdict
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 from ocr.ocr_engine import OCREngine
+from ocr.resources import ResourceGovernor
+from ocr.dedup import PageDedupIndex
 
 # Load environment variables
 load_dotenv()
@@ -26,8 +36,30 @@ app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 50 * 1024
 app.config['MAX_PAGES'] = int(os.getenv('MAX_PAGES', 50))
 app.config['CLEANUP_INTERVAL'] = int(os.getenv('CLEANUP_INTERVAL', 3600))
 app.config['FILE_RETENTION_TIME'] = int(os.getenv('FILE_RETENTION_TIME', 3600))
-
-ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'}
+app.config['STATE_FOLDER'] = os.getenv('STATE_FOLDER', 'state')
+# Admission control: estimated seconds of OCR work a node may have queued
+app.config['BACKLOG_BUDGET'] = float(os.getenv('BACKLOG_BUDGET', 300))
+app.config['SECONDS_PER_MEGAPIXEL'] = float(os.getenv('SECONDS_PER_MEGAPIXEL', 0.5))
+app.config['BACKLOG_ENTRY_TTL'] = int(os.getenv('BACKLOG_ENTRY_TTL', 900))
+# Upper bound on bytes kept in uploads/outputs; 0 disables the cap
+app.config['DISK_USAGE_CAP'] = int(os.getenv('DISK_USAGE_CAP', 0))
+# Download offload to the front proxy: '' (serve from Python), 'nginx' or 'sendfile'
+app.config['DOWNLOAD_OFFLOAD'] = os.getenv('DOWNLOAD_OFFLOAD', '').lower()
+# nginx internal location that maps to OUTPUT_FOLDER
+app.config['DOWNLOAD_ACCEL_PREFIX'] = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-outputs')
+app.config['USE_X_SENDFILE'] = app.config['DOWNLOAD_OFFLOAD'] == 'sendfile'
+# Batch endpoint limits
+app.config['BATCH_MAX_FILES'] = int(os.getenv('BATCH_MAX_FILES', 200))
+app.config['BATCH_MAX_UNCOMPRESSED'] = int(os.getenv('BATCH_MAX_UNCOMPRESSED', 500 * 1024 * 1024))
+app.config['BATCH_CONCURRENCY'] = int(os.getenv('BATCH_CONCURRENCY', 2))
+
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tif', 'tiff', 'bmp'}
+OUTPUT_FORMATS = ['txt', 'docx', 'xlsx', 'jsonl', 'hocr', 'pdf']
+# Text outputs get a precompressed .gz variant for downloads
+TEXT_OUTPUT_FORMATS = {'txt', 'jsonl', 'hocr'}
+
+mimetypes.add_type('application/x-ndjson', '.jsonl')
+mimetypes.add_type('text/html', '.hocr')
 SUPPORTED_LANGUAGES = {
     'eng': 'English',
     'spa': 'Spanish',
@@ -45,6 +77,7 @@ SUPPORTED_LANGUAGES = {
 # Create necessary folders
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+os.makedirs(app.config['STATE_FOLDER'], exist_ok=True)
 
 # Initialize logging
 logging.basicConfig(
@@ -59,10 +92,122 @@ logger = logging.getLogger(__name__)
 
 # Initialize OCR Engine
 tesseract_path = os.getenv('TESSERACT_PATH')
-ocr_engine = OCREngine(tesseract_path=tesseract_path)
+governor = ResourceGovernor(
+    cpu_budget=int(os.getenv('OCR_CPU_BUDGET', 0)) or None,
+    threads_per_job=int(os.getenv('OCR_THREADS_PER_JOB', 1))
+)
+admit_timeout = os.getenv('OCR_ADMIT_TIMEOUT')
+dedup_index = None
+if os.getenv('DEDUP_ENABLED', 'true').lower() == 'true':
+    dedup_index = PageDedupIndex(max_entries=int(os.getenv('DEDUP_MAX_ENTRIES', 256)))
+ocr_engine = OCREngine(
+    tesseract_path=tesseract_path,
+    queue_size=int(os.getenv('PIPELINE_QUEUE_SIZE', 2)),
+    governor=governor,
+    admit_timeout=float(admit_timeout) if admit_timeout else None,
+    checkpoint_folder=os.path.join(app.config['STATE_FOLDER'], 'checkpoints'),
+    dedup_index=dedup_index,
+    mode=os.getenv('OCR_MODE', 'full'),
+    cascade_min_conf=float(os.getenv('CASCADE_MIN_CONF', 75))
+)
+
+# Fair-share weights per client (API key or IP), e.g. CLIENT_WEIGHTS="partner-key=4,10.0.0.7=0.5";
+# everyone else weighs 1
+for item in os.getenv('CLIENT_WEIGHTS', '').split(','):
+    client_id, _, weight = item.strip().rpartition('=')
+    if client_id and weight:
+        ocr_engine.scheduler.set_weight(client_id, float(weight))
+
+
+def warm_up_engine():
+    
+    languages = os.getenv('OCR_WARMUP_LANGUAGES', 'eng').split(',')
+    ocr_engine.warm_up([lang.strip() for lang in languages if lang.strip()])
+
+
+# Preload the OCR stack and language data off the request path.
+# Under gunicorn this runs once in the master instead (see gunicorn.conf.py, OCR_PRELOAD).
+if os.getenv('OCR_WARMUP', 'true').lower() == 'true':
+    threading.Thread(target=warm_up_engine, daemon=True).start()
+
+# Rate limit history, the admission backlog and the artifact expiry index
+# live in SQLite so every worker process on the node sees the same state
+STATE_DB = os.path.join(app.config['STATE_FOLDER'], 'state.sqlite3')
+_db_local = threading.local()
+
+
+def get_state_db():
+    
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(STATE_DB, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_limit (ip TEXT NOT NULL, ts REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS rate_limit_ip_ts ON rate_limit (ip, ts)')
+        conn.execute('CREATE TABLE IF NOT EXISTS backlog (id TEXT PRIMARY KEY, cost REAL NOT NULL, started REAL NOT NULL)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS artifacts ('
+            'path TEXT PRIMARY KEY, kind TEXT NOT NULL, size INTEGER NOT NULL, '
+            'created REAL NOT NULL, expires REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS artifacts_expires ON artifacts (expires)')
+        _db_local.conn = conn
+    return conn
+
+
+def admit_work(work_id, cost):
+    
+    # Returns (admitted, backlog_seconds) after atomically checking the node budget
+    conn = get_state_db()
+    current_time = time.time()
+    
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Entries from workers that died mid-request would otherwise pin the backlog
+        conn.execute('DELETE FROM backlog WHERE started < ?', (current_time - app.config['BACKLOG_ENTRY_TTL'],))
+        backlog = conn.execute('SELECT COALESCE(SUM(cost), 0) FROM backlog').fetchone()[0]
+        
+        # An idle node always takes the request, however large
+        if backlog > 0 and backlog + cost > app.config['BACKLOG_BUDGET']:
+            conn.execute('COMMIT')
+            return False, backlog
+        
+        conn.execute('INSERT INTO backlog (id, cost, started) VALUES (?, ?, ?)', (work_id, cost, current_time))
+        conn.execute('COMMIT')
+        return True, backlog + cost
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def update_work(work_id, cost):
+    
+    # Long-running work (a streaming batch, a multi-file upload) reports its
+    # remaining cost as it goes, which also keeps its entry younger than BACKLOG_ENTRY_TTL
+    get_state_db().execute(
+        'UPDATE backlog SET cost = ?, started = ? WHERE id = ?',
+        (max(0.0, cost), time.time(), work_id)
+    )
 
-# Rate limiting storage
-rate_limit_storage = defaultdict(list)
+
+def finish_work(work_id):
+    
+    get_state_db().execute('DELETE FROM backlog WHERE id = ?', (work_id,))
+
+
+def current_backlog():
+    
+    conn = get_state_db()
+    backlog, active = conn.execute(
+        'SELECT COALESCE(SUM(cost), 0), COUNT(*) FROM backlog WHERE started >= ?',
+        (time.time() - app.config['BACKLOG_ENTRY_TTL'],)
+    ).fetchone()
+    return {
+        'backlog_seconds': round(backlog, 1),
+        'active_requests': active,
+        'budget_seconds': app.config['BACKLOG_BUDGET'],
+        'utilisation': round(backlog / app.config['BACKLOG_BUDGET'], 3) if app.config['BACKLOG_BUDGET'] else 0.0
+    }
 
 
 def rate_limit(max_per_minute=10, max_per_hour=100):
@@ -77,28 +222,36 @@ def rate_limit(max_per_minute=10, max_per_hour=100):
             ip = request.remote_addr
             current_time = time.time()
             
-            # Clean old entries
-            rate_limit_storage[ip] = [
-                timestamp for timestamp in rate_limit_storage[ip]
-                if current_time - timestamp < 3600
-            ]
+            conn = get_state_db()
             
-            # Check limits
-            recent_requests = [
-                timestamp for timestamp in rate_limit_storage[ip]
-                if current_time - timestamp < 60
-            ]
-            
-            if len(recent_requests) >= max_per_minute:
-                logger.warning(f"Rate limit exceeded for IP: {ip}")
-                return jsonify({'error': 'Too many requests. Please wait a minute.'}), 429
-            
-            if len(rate_limit_storage[ip]) >= max_per_hour:
-                logger.warning(f"Hourly rate limit exceeded for IP: {ip}")
-                return jsonify({'error': 'Hourly limit reached. Please try again later.'}), 429
-            
-            # Add current request
-            rate_limit_storage[ip].append(current_time)
+            # Check and record atomically across workers
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Clean old entries
+                conn.execute('DELETE FROM rate_limit WHERE ts <= ?', (current_time - 3600,))
+                
+                # Check limits
+                hour_count, minute_count = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(ts > ?), 0) FROM rate_limit WHERE ip = ?',
+                    (current_time - 60, ip)
+                ).fetchone()
+                
+                if minute_count >= max_per_minute:
+                    conn.execute('COMMIT')
+                    logger.warning(f"Rate limit exceeded for IP: {ip}")
+                    return jsonify({'error': 'Too many requests. Please wait a minute.'}), 429
+                
+                if hour_count >= max_per_hour:
+                    conn.execute('COMMIT')
+                    logger.warning(f"Hourly rate limit exceeded for IP: {ip}")
+                    return jsonify({'error': 'Hourly limit reached. Please try again later.'}), 429
+                
+                # Add current request
+                conn.execute('INSERT INTO rate_limit (ip, ts) VALUES (?, ?)', (ip, current_time))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
             
             return f(*args, **kwargs)
         return decorated_function
@@ -110,31 +263,138 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def register_artifact(path, kind, ttl=None):
+    
+    # Record a file with its expiry so cleanup never has to scan the folders
+    current_time = time.time()
+    ttl = app.config['FILE_RETENTION_TIME'] if ttl is None else ttl
+    get_state_db().execute(
+        'INSERT OR REPLACE INTO artifacts (path, kind, size, created, expires) VALUES (?, ?, ?, ?, ?)',
+        (path, kind, os.path.getsize(path), current_time, current_time + ttl)
+    )
+    if app.config['DISK_USAGE_CAP']:
+        enforce_disk_cap()
+
+
+def remove_artifact(path):
+    
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    get_state_db().execute('DELETE FROM artifacts WHERE path = ?', (path,))
+
+
+def expire_artifacts():
+    
+    # Deletes everything past its expiry; returns when the next artifact is due
+    conn = get_state_db()
+    current_time = time.time()
+    
+    for (path,) in conn.execute('SELECT path FROM artifacts WHERE expires <= ?', (current_time,)).fetchall():
+        remove_artifact(path)
+        logger.info(f"Expired file: {path}")
+    
+    return conn.execute('SELECT MIN(expires) FROM artifacts').fetchone()[0]
+
+
+def enforce_disk_cap():
+    
+    # Oldest-first eviction of outputs once the indexed files exceed the cap.
+    # Uploads are in use by a running request and are deleted when it ends.
+    conn = get_state_db()
+    cap = app.config['DISK_USAGE_CAP']
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0]
+    if total <= cap:
+        return
+    
+    for path, size in conn.execute("SELECT path, size FROM artifacts WHERE kind = 'output' ORDER BY created").fetchall():
+        if total <= cap:
+            break
+        remove_artifact(path)
+        total -= size
+        logger.info(f"Evicted file over disk cap: {path}")
+
+
+def index_existing_files():
+    
+    # One-off reconcile at startup: adopt files the index does not know about
+    # (e.g. written before an upgrade) using their mtime as creation time
+    conn = get_state_db()
+    known = {path for (path,) in conn.execute('SELECT path FROM artifacts')}
+    retention_time = app.config['FILE_RETENTION_TIME']
+    
+    for kind, folder in [('upload', app.config['UPLOAD_FOLDER']), ('output', app.config['OUTPUT_FOLDER'])]:
+        for filename in os.listdir(folder):
+            filepath = os.path.join(folder, filename)
+            if filepath in known or not os.path.isfile(filepath):
+                continue
+            stat = os.stat(filepath)
+            conn.execute(
+                'INSERT OR IGNORE INTO artifacts (path, kind, size, created, expires) VALUES (?, ?, ?, ?, ?)',
+                (filepath, kind, stat.st_size, stat.st_mtime, stat.st_mtime + retention_time)
+            )
+    
+    # Drop index rows whose files were removed behind our back
+    for path in known:
+        if not os.path.exists(path):
+            conn.execute('DELETE FROM artifacts WHERE path = ?', (path,))
+
+
 def cleanup_old_files():
     
+    try:
+        index_existing_files()
+    except Exception as e:
+        logger.error(f"Cleanup error: {e}")
+    
+    last_checkpoint_sweep = 0
     while True:
+        next_expiry = None
         try:
-            current_time = time.time()
-            retention_time = app.config['FILE_RETENTION_TIME']
+            next_expiry = expire_artifacts()
+            if app.config['DISK_USAGE_CAP']:
+                enforce_disk_cap()
             
-            for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']]:
-                for filename in os.listdir(folder):
-                    filepath = os.path.join(folder, filename)
-                    if os.path.isfile(filepath):
-                        file_age = current_time - os.path.getmtime(filepath)
-                        if file_age > retention_time:
-                            os.remove(filepath)
-                            logger.info(f"Cleaned up old file: {filepath}")
+            # Abandoned page checkpoints (one directory per document)
+            current_time = time.time()
+            if current_time - last_checkpoint_sweep >= app.config['CLEANUP_INTERVAL']:
+                last_checkpoint_sweep = current_time
+                checkpoint_folder = os.path.join(app.config['STATE_FOLDER'], 'checkpoints')
+                if os.path.isdir(checkpoint_folder):
+                    for name in os.listdir(checkpoint_folder):
+                        path = os.path.join(checkpoint_folder, name)
+                        if os.path.isdir(path) and current_time - os.path.getmtime(path) > app.config['FILE_RETENTION_TIME']:
+                            shutil.rmtree(path, ignore_errors=True)
+                            logger.info(f"Cleaned up stale checkpoint: {path}")
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
         
-        time.sleep(app.config['CLEANUP_INTERVAL'])
+        # Wake when the next artifact is due, and at least once a minute so
+        # the disk cap and checkpoint sweep keep running
+        delay = min(app.config['CLEANUP_INTERVAL'], 60)
+        if next_expiry is not None:
+            delay = min(delay, max(0.5, next_expiry - time.time()))
+        time.sleep(delay)
+
 
+cleanup_thread = None
+_cleanup_lock = threading.Lock()
 
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
-cleanup_thread.start()
-logger.info("Cleanup thread started")
+
+def start_cleanup_thread():
+    
+    global cleanup_thread
+    with _cleanup_lock:
+        if cleanup_thread is None:
+            cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
+            cleanup_thread.start()
+            logger.info("Cleanup thread started")
+
+
+# Under gunicorn one elected worker starts this instead (see gunicorn.conf.py)
+if os.getenv('START_BACKGROUND_TASKS', 'true').lower() == 'true':
+    start_cleanup_thread()
 
 
 @app.route('/')
@@ -163,7 +423,7 @@ def upload_file():
             return jsonify({'error': 'No files selected'}), 400
         
         # Validate output format
-        if output_format not in ['txt', 'docx', 'xlsx']:
+        if output_format not in OUTPUT_FORMATS:
             return jsonify({'error': 'Invalid output format'}), 400
         
         # Validate language
@@ -183,6 +443,8 @@ def upload_file():
                 
                 # Save uploaded file
                 file.save(filepath)
+                # Indexed so it still expires if this worker dies before deleting it
+                register_artifact(filepath, 'upload')
                 logger.info(f"Saved file: {filename}")
                 
                 processed_files.append({
@@ -197,37 +459,43 @@ def upload_file():
         if not processed_files:
             return jsonify({'error': 'No valid files to process'}), 400
         
-        # Process all files
-        results = []
+        # Estimate the work before starting it and shed load if the node is full
         for file_info in processed_files:
-            start_time = time.time()
-            
-            result = ocr_engine.process_document(
-                input_path=file_info['path'],
-                output_format=output_format,
-                output_folder=app.config['OUTPUT_FOLDER'],
-                file_id=file_info['id'],
-                language=language
+            estimate = ocr_engine.estimate_cost(file_info['path'])
+            file_info['cost'] = estimate['cost']
+            file_info['pages'] = estimate['pages']
+        estimated_cost = sum(file_info['cost'] for file_info in processed_files) * app.config['SECONDS_PER_MEGAPIXEL']
+        work_id = str(uuid.uuid4())
+        admitted, backlog = admit_work(work_id, estimated_cost)
+        
+        if not admitted:
+            for file_info in processed_files:
+                remove_artifact(file_info['path'])
+            retry_after = min(300, max(1, math.ceil(backlog + estimated_cost - app.config['BACKLOG_BUDGET'])))
+            logger.warning(f"Shedding upload: estimated {estimated_cost:.1f}s on a backlog of {backlog:.1f}s")
+            response = jsonify({
+                'error': 'Server is busy. Please retry later.',
+                'retry_after': retry_after
+            })
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 503
+        
+        try:
+            # Fair share is per API key when one is sent, otherwise per IP
+            client_id = request.headers.get('X-API-Key') or request.remote_addr
+            # The priority flag is only honoured for a single one-page file, not
+            # multi-page PDFs or TIFFs or batches
+            interactive = (
+                request.form.get('priority') == 'interactive' and
+                len(processed_files) == 1 and
+                processed_files[0]['pages'] == 1
             )
-            
-            processing_time = time.time() - start_time
-            
-            if result['success']:
-                logger.info(f"Successfully processed: {file_info['original']} in {processing_time:.2f}s")
-                results.append({
-                    'original_filename': file_info['original'],
-                    'output_filename': os.path.basename(result['output_path']),
-                    'pages': result['pages'],
-                    'processing_time': round(processing_time, 2),
-                    'success': True
-                })
-            else:
-                logger.error(f"Processing failed: {file_info['original']} - {result['error']}")
-                results.append({
-                    'original_filename': file_info['original'],
-                    'error': result['error'],
-                    'success': False
-                })
+            results = process_files(processed_files, output_format, language, client_id, interactive, work_id)
+        finally:
+            finish_work(work_id)
+            # Uploads are not needed once processed; outputs expire on their own schedule
+            for file_info in processed_files:
+                remove_artifact(file_info['path'])
         
         # Check if any succeeded
         successful = [r for r in results if r['success']]
@@ -245,22 +513,333 @@ def upload_file():
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+def process_files(processed_files, output_format, language, client_id='', interactive=False, work_id=None):
+    
+    # Process all files
+    results = []
+    remaining_cost = sum(file_info.get('cost', 0.0) for file_info in processed_files) * app.config['SECONDS_PER_MEGAPIXEL']
+    for file_info in processed_files:
+        start_time = time.time()
+        
+        result = ocr_engine.process_document(
+            input_path=file_info['path'],
+            output_format=output_format,
+            output_folder=app.config['OUTPUT_FOLDER'],
+            file_id=file_info['id'],
+            language=language,
+            client_id=client_id,
+            interactive=interactive,
+            cost=file_info.get('cost')
+        )
+        
+        processing_time = time.time() - start_time
+        
+        if result['success']:
+            register_artifact(result['output_path'], 'output')
+            if output_format in TEXT_OUTPUT_FORMATS:
+                precompress_output(result['output_path'])
+            logger.info(f"Successfully processed: {file_info['original']} in {processing_time:.2f}s")
+            logger.debug(f"Stage stats for {file_info['original']}: {result['stage_stats']}")
+            results.append({
+                'original_filename': file_info['original'],
+                'output_filename': os.path.basename(result['output_path']),
+                'pages': result['pages'],
+                'deduplicated_pages': result['deduplicated_pages'],
+                'processing_time': round(processing_time, 2),
+                'success': True
+            })
+        else:
+            logger.error(f"Processing failed: {file_info['original']} - {result['error']}")
+            failure = {
+                'original_filename': file_info['original'],
+                'error': result['error'],
+                'success': False
+            }
+            # Report how far a partially completed document got; a retry resumes from there
+            if 'completed_pages' in result:
+                failure['pages'] = result['pages']
+                failure['completed_pages'] = result['completed_pages']
+                failure['resumable'] = result['resumable']
+            results.append(failure)
+        
+        # A long multi-file upload would otherwise outlive its BACKLOG_ENTRY_TTL
+        if work_id:
+            remaining_cost -= file_info.get('cost', 0.0) * app.config['SECONDS_PER_MEGAPIXEL']
+            update_work(work_id, remaining_cost)
+    
+    return results
+
+
+def precompress_output(path):
+    
+    # A .gz sibling lets downloads skip on-the-fly compression; it expires with the output
+    try:
+        with open(path, 'rb') as src, gzip.open(f"{path}.gz", 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        register_artifact(f"{path}.gz", 'output')
+    except Exception as e:
+        logger.warning(f"Could not precompress {path}: {e}")
+
+
+class _ZipStream(io.RawIOBase):
+    
+    # Write-only sink for zipfile; bytes are handed to the response as they are produced
+    def __init__(self):
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def save_batch_entries():
+    
+    # Returns saved file infos from either a ZIP ('archive') or plain multi-file ('files') upload
+    saved = []
+    
+    def save_entry(name, source):
+        original_filename = secure_filename(os.path.basename(name))
+        if not original_filename or not allowed_file(original_filename):
+            return
+        if len(saved) >= app.config['BATCH_MAX_FILES']:
+            raise ValueError(f"Too many files in batch. Maximum is {app.config['BATCH_MAX_FILES']}.")
+        unique_id = str(uuid.uuid4())[:8]
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{original_filename}")
+        with open(filepath, 'wb') as dst:
+            shutil.copyfileobj(source, dst, 1024 * 1024)
+        register_artifact(filepath, 'upload')
+        # Keep the archive's folder layout in the results, minus anything like '..'
+        parts = [secure_filename(part) for part in name.replace('\\', '/').split('/')]
+        archive_path = '/'.join(part for part in parts if part)
+        saved.append({'original': name, 'archive_path': archive_path, 'path': filepath, 'id': unique_id})
+    
+    try:
+        archive = request.files.get('archive')
+        if archive and archive.filename:
+            with zipfile.ZipFile(archive.stream) as zf:
+                entries = [info for info in zf.infolist() if not info.is_dir()]
+                # Refuse zip bombs before extracting anything
+                if sum(info.file_size for info in entries) > app.config['BATCH_MAX_UNCOMPRESSED']:
+                    raise ValueError('Archive is too large when uncompressed.')
+                for info in entries:
+                    with zf.open(info) as source:
+                        save_entry(info.filename, source)
+        
+        for file in request.files.getlist('files'):
+            if file and file.filename:
+                save_entry(file.filename, file.stream)
+    except Exception:
+        for file_info in saved:
+            remove_artifact(file_info['path'])
+        raise
+    
+    return saved
+
+
+@app.route('/batch', methods=['POST'])
+@rate_limit(max_per_minute=10, max_per_hour=100)
+def batch_upload():
+    
+    try:
+        output_format = request.form.get('format', 'txt')
+        language = request.form.get('language', 'eng')
+        
+        if output_format not in OUTPUT_FORMATS:
+            return jsonify({'error': 'Invalid output format'}), 400
+        if language not in SUPPORTED_LANGUAGES:
+            language = 'eng'
+        
+        try:
+            saved = save_batch_entries()
+        except (ValueError, zipfile.BadZipFile) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not saved:
+            return jsonify({'error': 'No valid files to process'}), 400
+        
+        logger.info(f"Batch request: {len(saved)} file(s), format={output_format}, language={language}")
+        
+        # Same admission control as /upload, for the batch as a whole
+        for file_info in saved:
+            file_info['cost'] = ocr_engine.estimate_cost(file_info['path'])['cost']
+        estimated_cost = sum(file_info['cost'] for file_info in saved) * app.config['SECONDS_PER_MEGAPIXEL']
+        work_id = str(uuid.uuid4())
+        admitted, backlog = admit_work(work_id, estimated_cost)
+        
+        if not admitted:
+            for file_info in saved:
+                remove_artifact(file_info['path'])
+            retry_after = min(300, max(1, math.ceil(backlog + estimated_cost - app.config['BACKLOG_BUDGET'])))
+            response = jsonify({'error': 'Server is busy. Please retry later.', 'retry_after': retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 503
+        
+        client_id = request.headers.get('X-API-Key') or request.remote_addr
+        
+        def process_entry(file_info):
+            result = ocr_engine.process_document(
+                input_path=file_info['path'],
+                output_format=output_format,
+                output_folder=app.config['OUTPUT_FOLDER'],
+                file_id=file_info['id'],
+                language=language,
+                client_id=client_id,
+                cost=file_info['cost']
+            )
+            # Indexed as soon as it exists, so it still expires if the client
+            # disconnects before it is streamed
+            if result['success']:
+                register_artifact(result['output_path'], 'output')
+            return result
+        
+        def generate():
+            sink = _ZipStream()
+            manifest = []
+            used_names = set()
+            streamed = set()
+            remaining_cost = estimated_cost
+            executor = ThreadPoolExecutor(max_workers=app.config['BATCH_CONCURRENCY'])
+            futures = {}
+            try:
+                with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                    futures = {executor.submit(process_entry, file_info): file_info for file_info in saved}
+                    
+                    # Entries go out in completion order, one chunk at a time
+                    for future in as_completed(futures):
+                        file_info = futures[future]
+                        streamed.add(future)
+                        remove_artifact(file_info['path'])
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            # One broken entry must not cut the archive short
+                            logger.exception(f"Batch entry failed: {file_info['original']}")
+                            result = {'success': False, 'error': f'Processing error: {str(e)}'}
+                        entry = {'original_filename': file_info['original'], 'success': result['success']}
+                        
+                        remaining_cost -= file_info['cost'] * app.config['SECONDS_PER_MEGAPIXEL']
+                        update_work(work_id, remaining_cost)
+                        
+                        if result['success'] and not os.path.isfile(result['output_path']):
+                            # Evicted under the disk cap before it could be sent
+                            entry.update({'success': False, 'error': 'Output expired before it could be sent'})
+                        elif result['success']:
+                            stem = os.path.splitext(file_info['archive_path'])[0]
+                            arcname = f"{stem}.{output_format}"
+                            n = 1
+                            while arcname in used_names:
+                                arcname = f"{stem}_{n}.{output_format}"
+                                n += 1
+                            used_names.add(arcname)
+                            
+                            with open(result['output_path'], 'rb') as src, zf.open(arcname, 'w') as dst:
+                                for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                                    dst.write(chunk)
+                                    yield sink.drain()
+                            yield sink.drain()
+                            # The output only lives in the archive
+                            remove_artifact(result['output_path'])
+                            entry.update({'output_filename': arcname, 'pages': result['pages']})
+                        else:
+                            entry['error'] = result['error']
+                        
+                        manifest.append(entry)
+                    
+                    zf.writestr('manifest.json', json.dumps({
+                        'format': output_format,
+                        'language': language,
+                        'files': manifest,
+                        'successful': sum(1 for entry in manifest if entry['success'])
+                    }, indent=2))
+                yield sink.drain()
+                logger.info(f"Batch finished: {sum(1 for e in manifest if e['success'])}/{len(saved)} succeeded")
+            finally:
+                # Also runs if the client disconnects mid-stream: outputs that
+                # finished but were never sent go now, and jobs still running
+                # leave indexed outputs that expire like any other
+                executor.shutdown(wait=False, cancel_futures=True)
+                for future, file_info in futures.items():
+                    if future in streamed or not future.done() or future.cancelled() or future.exception():
+                        continue
+                    result = future.result()
+                    if result['success']:
+                        remove_artifact(result['output_path'])
+                finish_work(work_id)
+                for file_info in saved:
+                    remove_artifact(file_info['path'])
+        
+        response = Response(stream_with_context(generate()), mimetype='application/zip')
+        response.headers['Content-Disposition'] = 'attachment; filename="ocr_results.zip"'
+        return response
+    
+    except Exception as e:
+        logger.exception("Batch error occurred")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+
 @app.route('/download/<filename>')
 def download_file(filename):
     
     try:
-        filepath = os.path.join(app.config['OUTPUT_FOLDER'], secure_filename(filename))
+        filename = secure_filename(filename)
+        # Absolute, since send_file resolves relative paths against the app root, not the cwd
+        filepath = os.path.abspath(os.path.join(app.config['OUTPUT_FOLDER'], filename))
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        
+        # Serve the precompressed variant to clients that accept gzip
+        content_encoding = None
+        is_text = filename.rsplit('.', 1)[-1] in TEXT_OUTPUT_FORMATS
+        if is_text and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            if os.path.isfile(f"{filepath}.gz"):
+                filepath = f"{filepath}.gz"
+                content_encoding = 'gzip'
         
-        if not os.path.exists(filepath):
+        # One stat instead of exists() followed by send_file's own checks
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
             logger.warning(f"Download attempt for non-existent file: {filename}")
             return jsonify({'error': 'File not found'}), 404
         
         logger.info(f"File downloaded: {filename}")
-        return send_file(
-            filepath,
-            as_attachment=True,
-            download_name=filename
-        )
+        
+        if app.config['DOWNLOAD_OFFLOAD'] == 'nginx':
+            # nginx streams the file itself and handles ranges and conditionals
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = (
+                f"{app.config['DOWNLOAD_ACCEL_PREFIX'].rstrip('/')}/{os.path.basename(filepath)}"
+            )
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        else:
+            # Conditional (ETag/Last-Modified) and Range requests are answered by
+            # send_file; with USE_X_SENDFILE the body is left to the proxy
+            response = send_file(
+                filepath,
+                mimetype=mimetype,
+                as_attachment=True,
+                download_name=filename,
+                conditional=True,
+                etag=True,
+                last_modified=stat.st_mtime,
+                max_age=app.config['FILE_RETENTION_TIME']
+            )
+        
+        if content_encoding:
+            response.headers['Content-Encoding'] = content_encoding
+        if is_text:
+            response.vary.add('Accept-Encoding')
+        # Outputs are per-user; browsers may cache them, shared caches may not
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
     
     except Exception as e:
         logger.error(f"Download error: {e}")
@@ -274,11 +853,24 @@ def health():
     return jsonify({
         'status': 'healthy',
         'tesseract': tesseract_status,
+        'resources': governor.status(),
+        'scheduler': ocr_engine.scheduler.status(),
+        'dedup': dedup_index.stats() if dedup_index else None,
+        'backlog': current_backlog(),
         'uptime': time.time(),
         'environment': os.getenv('FLASK_ENV', 'production')
     })
 
 
+@app.route('/load')
+def load():
+    
+    # For upstream load balancers: 503 while this node is over its backlog budget
+    backlog = current_backlog()
+    status_code = 503 if backlog['backlog_seconds'] >= app.config['BACKLOG_BUDGET'] else 200
+    return jsonify(backlog), status_code
+
+
 @app.route('/languages')
 def get_languages():
     
@@ -0,0 +1,142 @@
+"""
+Compares full and cascade OCR modes: seconds per page and accuracy against ground truth
+
+Needs a Tesseract install. With no arguments it renders synthetic pages: clean
+paragraphs plus a degraded (noisy, low-contrast, blurred) region, so the
+cascade has weak lines to re-run. Pass a directory of page images, each with
+a same-named .txt transcript, to benchmark real scans instead.
+
+Usage: python benchmarks/bench_cascade.py [pages_dir] [--lang eng] [--pages 5]
+"""
+
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from ocr.ocr_engine import OCREngine
+
+
+WORDS = (
+    'invoice total amount payment received account balance customer order date '
+    'reference number quantity price tax shipping address delivery schedule '
+    'contract agreement section clause report summary review approved pending'
+).split()
+
+
+def load_font(size):
+    for path in ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'DejaVuSans.ttf', 'arial.ttf'):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def synthetic_page(rng, font):
+    import numpy as np
+
+    page = Image.new('L', (2480, 3508), 255)
+    draw = ImageDraw.Draw(page)
+    lines = []
+    y = 200
+    while y < 3200:
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 9)))
+        draw.text((200, y), line, fill=0, font=font)
+        lines.append(line)
+        y += 70 if rng.random() > 0.15 else 140
+
+    # Degrade a band of lines the way a bad scan or a coffee stain would
+    top = rng.randint(800, 2200)
+    band = page.crop((150, top, 2330, top + 500)).filter(ImageFilter.GaussianBlur(1.6))
+    pixels = np.asarray(band, dtype=np.float32)
+    pixels = 110 + pixels * 0.45 + np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 28, pixels.shape)
+    page.paste(Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)), (150, top))
+    return page, '\n'.join(lines)
+
+
+def load_pages(args):
+    if args.pages_dir:
+        pages = []
+        for name in sorted(os.listdir(args.pages_dir)):
+            stem, ext = os.path.splitext(name)
+            truth_path = os.path.join(args.pages_dir, stem + '.txt')
+            if ext.lower() in ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp') and os.path.exists(truth_path):
+                with open(truth_path, encoding='utf-8') as f:
+                    pages.append((Image.open(os.path.join(args.pages_dir, name)).convert('L'), f.read()))
+        return pages
+
+    rng = random.Random(7)
+    font = load_font(38)
+    return [synthetic_page(rng, font) for _ in range(args.pages)]
+
+
+def word_accuracy(text, truth):
+    # Share of ground-truth words recovered in order
+    matcher = difflib.SequenceMatcher(None, truth.split(), text.split(), autojunk=False)
+    matched = sum(block.size for block in matcher.get_matching_blocks())
+    return matched / max(1, len(truth.split()))
+
+
+def char_accuracy(text, truth):
+    return difflib.SequenceMatcher(None, ' '.join(truth.split()), ' '.join(text.split()), autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pages_dir', nargs='?')
+    parser.add_argument('--lang', default='eng')
+    parser.add_argument('--pages', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        sys.exit('No pages to benchmark')
+
+    results = {}
+    for mode in ('full', 'cascade'):
+        engine = OCREngine(mode=mode)
+        if not engine.check_tesseract()['available']:
+            sys.exit('Tesseract is not available; install it or set TESSERACT_PATH')
+        engine.warm_up((args.lang,))
+
+        elapsed = 0.0
+        words = chars = 0.0
+        regions = improved = 0
+        for idx, (image, truth) in enumerate(pages, 1):
+            start = time.perf_counter()
+            page = engine._extract_page_data(image, idx, args.lang)
+            elapsed += time.perf_counter() - start
+            words += word_accuracy(page['text'], truth)
+            chars += char_accuracy(page['text'], truth)
+            if 'cascade' in page:
+                regions += page['cascade']['regions']
+                improved += page['cascade']['improved_regions']
+
+        results[mode] = {
+            'seconds_per_page': elapsed / len(pages),
+            'word_accuracy': words / len(pages),
+            'char_accuracy': chars / len(pages),
+            'regions': regions,
+            'improved': improved,
+        }
+
+    print(f"{len(pages)} page(s), lang={args.lang}")
+    print(f"{'mode':<8} {'s/page':>8} {'words':>8} {'chars':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<8} {result['seconds_per_page']:>8.2f} {result['word_accuracy']:>8.3f} {result['char_accuracy']:>8.3f}")
+
+    full, cascade = results['full'], results['cascade']
+    print(f"\ncascade re-ran {cascade['regions']} region(s), kept {cascade['improved']} improved reading(s)")
+    print(f"time saved: {1 - cascade['seconds_per_page'] / full['seconds_per_page']:.1%}, "
+          f"word accuracy change: {cascade['word_accuracy'] - full['word_accuracy']:+.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Load-test scenario for FairScheduler: per-class queue-wait percentiles
+
+A heavy batch client floods the queue with large documents while several
+light clients submit batch jobs and interactive single images arrive at a
+steady rate. Job run time is simulated as cost milliseconds.
+
+Usage: python benchmarks/load_test_scheduler.py [cpu_budget]
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr.resources import ResourceGovernor
+from ocr.scheduler import FairScheduler
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    cpu_budget = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=cpu_budget))
+    rng = random.Random(42)
+    latencies = {'heavy batch': [], 'light batch': [], 'interactive': []}
+    lock = threading.Lock()
+
+    def job(label, client_id, cost, interactive):
+        start = time.monotonic()
+        scheduler.acquire(1, client_id=client_id, cost=cost, interactive=interactive)
+        try:
+            time.sleep(cost / 1000)
+        finally:
+            scheduler.release(1)
+        with lock:
+            latencies[label].append(time.monotonic() - start)
+
+    threads = []
+
+    def submit(*args):
+        thread = threading.Thread(target=job, args=args)
+        thread.start()
+        threads.append(thread)
+
+    # The heavy client dumps its whole backlog up front
+    for _ in range(60):
+        submit('heavy batch', 'heavy', rng.uniform(40, 120), False)
+
+    # Light clients and interactive uploads arrive over the next few seconds
+    for i in range(120):
+        time.sleep(0.02)
+        if i % 3 == 0:
+            submit('light batch', f"light-{i % 5}", rng.uniform(10, 40), False)
+        else:
+            submit('interactive', f"user-{i}", rng.uniform(2, 8), True)
+
+    for thread in threads:
+        thread.join()
+
+    print(f"cpu_budget={cpu_budget}")
+    print(f"{'class':<12} {'jobs':>5} {'p50':>8} {'p95':>8} {'p99':>8}  (end-to-end seconds)")
+    for label, samples in latencies.items():
+        ordered = sorted(samples)
+        print(f"{label:<12} {len(ordered):>5} {percentile(ordered, 50):>8.3f} "
+              f"{percentile(ordered, 95):>8.3f} {percentile(ordered, 99):>8.3f}")
+
+    print("\nScheduler queue wait by class:")
+    for job_class, stats in scheduler.status()['queue_wait'].items():
+        print(f"{job_class:<12} {stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import multiprocessing
+
+# Production serving mode: gunicorn -c gunicorn.conf.py app:app
+#
+# The app and OCREngine are imported once in the master and shared
+# copy-on-write with the forked workers. Warm-up runs once in the master,
+# which starts no threads; the cleanup sweeper runs in exactly one worker.
+os.environ.setdefault('OCR_WARMUP', 'false')
+os.environ.setdefault('START_BACKGROUND_TASKS', 'false')
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+preload_app = True
+
+# Each document keeps about two cores busy (preprocessing overlaps with
+# Tesseract in the page pipeline), so size workers against that
+ocr_threads_per_worker = int(os.getenv('OCR_THREADS_PER_WORKER', 2))
+workers = int(os.getenv('WEB_CONCURRENCY', max(1, multiprocessing.cpu_count() // ocr_threads_per_worker)))
+
+# Split the machine's cores between workers so their OCR budgets add up to
+# the CPU count instead of each worker assuming it owns every core
+os.environ.setdefault('OCR_CPU_BUDGET', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# A couple of threads per worker keep /health and /download responsive
+# while an upload is being processed
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+
+# Large PDFs can take minutes to OCR
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth from image buffers
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 200))
+max_requests_jitter = 20
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def when_ready(server):
+    
+    # Runs in the master before any worker is forked
+    import app as application
+    
+    if os.getenv('OCR_PRELOAD', 'true').lower() == 'true':
+        application.warm_up_engine()
+        server.log.info("OCR engine preloaded")
+
+
+def post_fork(server, worker):
+    
+    # The first worker to lock the file runs the cleanup sweeper and holds the
+    # lock until it exits; when it is recycled, its replacement takes over.
+    # Threads are only ever started after the fork, never in the master
+    import fcntl
+    import app as application
+    
+    lock_file = open(os.path.join(application.app.config['STATE_FOLDER'], 'cleanup.lock'), 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return
+    
+    worker.cleanup_lock = lock_file
+    application.start_cleanup_thread()
+    server.log.info(f"Cleanup sweeper running in worker {worker.pid}")
@@ -2,8 +2,28 @@
 OCR Module for document processing
 """
 
-from .ocr_engine import OCREngine
-from .preprocess import ImagePreprocessor
-from .layout_parser import LayoutParser
+import importlib
 
-__all__ = ['OCREngine', 'ImagePreprocessor', 'LayoutParser']
\ No newline at end of file
+# Submodules are imported on first attribute access so that importing the
+# package does not pull in cv2, numpy or pytesseract
+_LAZY_ATTRS = {
+    'OCREngine': '.ocr_engine',
+    'ImagePreprocessor': '.preprocess',
+    'LayoutParser': '.layout_parser',
+    'PagePipeline': '.pipeline',
+    'ResourceGovernor': '.resources',
+    'FairScheduler': '.scheduler',
+    'CheckpointStore': '.checkpoint',
+    'PageDedupIndex': '.dedup',
+    'SearchablePDFWriter': '.pdf_writer',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
\ No newline at end of file
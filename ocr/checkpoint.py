@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+
+class CheckpointStore:
+
+
+    def __init__(self, folder):
+
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def key_for(self, input_path, language='eng', profile='advanced'):
+
+        # Keyed on content, not the upload's random id, so a resubmitted file resumes
+        digest = hashlib.sha256()
+        with open(input_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest.update(f"|{language}|{profile}".encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def load(self, key):
+
+        pages = {}
+        folder = os.path.join(self.folder, key)
+        if not os.path.isdir(folder):
+            return pages
+
+        for filename in os.listdir(folder):
+            if not (filename.startswith('page_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(folder, filename), 'r', encoding='utf-8') as f:
+                    page = json.load(f)
+                pages[page['page_num']] = page
+            except Exception as e:
+                # A torn or unreadable checkpoint just means that page is redone
+                print(f"Ignoring checkpoint {filename}: {e}")
+
+        return pages
+
+    def save(self, key, page_data):
+
+        folder = os.path.join(self.folder, key)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"page_{page_data['page_num']:04d}.json")
+
+        # Write then rename so a crash never leaves a half-written page behind;
+        # the temp name is unique so jobs on the same file never share one
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f"page_{page_data['page_num']:04d}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(page_data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def hold(self, key):
+
+        # Several jobs (threads or worker processes) can run the same file at
+        # once; each leaves a marker so the directory outlives all of them
+        folder = os.path.join(self.folder, key)
+        os.makedirs(folder, exist_ok=True)
+        token = os.path.join(folder, f".holder-{uuid.uuid4().hex}")
+        open(token, 'w').close()
+        return token
+
+    def release(self, key, token, clear=False):
+
+        try:
+            os.remove(token)
+        except FileNotFoundError:
+            pass
+
+        # Only the last job out removes the checkpoints; markers left by a
+        # crashed worker keep them until the stale-checkpoint sweep
+        if clear:
+            folder = os.path.join(self.folder, key)
+            try:
+                names = os.listdir(folder)
+            except FileNotFoundError:
+                return
+            if not any(name.startswith('.holder-') for name in names):
+                self.clear(key)
+
+    def clear(self, key):
+
+        shutil.rmtree(os.path.join(self.folder, key), ignore_errors=True)
@@ -0,0 +1,58 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PageDedupIndex:
+
+
+    def __init__(self, max_entries=256):
+
+        # Bounded LRU of recently recognized pages, shared across requests
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+
+    def fingerprint(self, image):
+
+        import numpy as np
+
+        # Exact identity of the full-resolution buffer Tesseract is given (the
+        # binarized page, or the raw grayscale in cascade mode) plus its shape.
+        # Perceptual hashes and thumbnails cannot tell "1,000" from "1.000",
+        # and reusing another page's transcript is never acceptable
+        digest = hashlib.sha256(np.ascontiguousarray(image).data).hexdigest()
+        return digest, tuple(image.shape)
+
+    def lookup(self, fingerprint, language):
+
+        key = (fingerprint, language)
+        with self._lock:
+            self._lookups += 1
+            result = self._entries.get(key)
+            if result is None:
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return result
+
+    def add(self, fingerprint, language, result):
+
+        with self._lock:
+            self._entries[(fingerprint, language)] = result
+            self._entries.move_to_end((fingerprint, language))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'lookups': self._lookups,
+                'hits': self._hits,
+                'hit_rate': round(self._hits / self._lookups, 3) if self._lookups else 0.0
+            }
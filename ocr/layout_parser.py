@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 import pytesseract
 
+from .preprocess import as_tesseract_image
+
 
 class LayoutParser:
     
@@ -100,7 +102,7 @@ class LayoutParser:
             if len(image.shape) == 3:
                 gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             else:
-                gray = image.copy()
+                gray = image
             
             # Threshold
             _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
@@ -147,7 +149,7 @@ class LayoutParser:
         try:
             # Use Tesseract to get detailed data
             data = pytesseract.image_to_data(
-                table_image, 
+                as_tesseract_image(table_image), 
                 lang='eng', 
                 config='--psm 6',
                 output_type=pytesseract.Output.DICT
@@ -1,32 +1,97 @@
 import os
-import pytesseract
-from PIL import Image
-import pdf2image
-import cv2
-import numpy as np
+import html
+import json
+import tempfile
+import threading
 from pathlib import Path
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import pandas as pd
 
-from .preprocess import ImagePreprocessor
-from .layout_parser import LayoutParser
+from .checkpoint import CheckpointStore
+from .pipeline import PagePipeline
+from .resources import ResourceGovernor
+from .scheduler import FairScheduler
+
+
+# Heavy dependencies (cv2, numpy, pytesseract, pdf2image, python-docx,
+# openpyxl) are imported on first use so importing the app stays cheap.
+
+# Relative CPU cost per megapixel of each preprocessing profile
+PROFILE_COST = {
+    'advanced': 1.0,
+    'adaptive': 0.6,
+    'otsu': 0.5,
+    'simple': 0.4,
+}
+
+# JPEG quality of the page images embedded in searchable PDFs
+PDF_JPEG_QUALITY = 75
 
 
 class OCREngine:
-    def __init__(self, tesseract_path=None):
+    def __init__(self, tesseract_path=None, queue_size=2, governor=None, admit_timeout=None,
+                 checkpoint_folder=None, dedup_index=None, mode='full', cascade_min_conf=75):
         
-        self.preprocessor = ImagePreprocessor()
-        self.layout_parser = LayoutParser()
+        self.tesseract_path = tesseract_path
         
-        # Set Tesseract path
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-        else:
-            self._auto_detect_tesseract()
+        # 'full' preprocesses every page; 'cascade' OCRs the raw page first and
+        # re-runs only low-confidence lines through the expensive preprocessing
+        self.mode = mode if mode in ('full', 'cascade') else 'full'
+        self.cascade_min_conf = cascade_min_conf
+        
+        # Pages allowed to wait between pipeline stages
+        self.queue_size = queue_size
+        
+        # Caps Tesseract/OpenCV threads and admits documents against a CPU budget
+        self.governor = governor or ResourceGovernor()
+        # Orders waiting documents by cost and per-client fair share
+        self.scheduler = FairScheduler(self.governor)
+        self.admit_timeout = admit_timeout
+        
+        # Completed pages are persisted here so a retried document resumes
+        self.checkpoints = CheckpointStore(checkpoint_folder) if checkpoint_folder else None
+        
+        # Reuses results for pages identical to one recognized recently
+        self.dedup_index = dedup_index
+        
+        self._preprocessor = None
+        self._layout_parser = None
+        self._tesseract_ready = False
+        self._init_lock = threading.Lock()
     
-    def _auto_detect_tesseract(self):
+    @property
+    def preprocessor(self):
+        
+        if self._preprocessor is None:
+            from .preprocess import ImagePreprocessor
+            self._preprocessor = ImagePreprocessor()
+            # cv2 is loaded now, so its thread pool can be capped
+            self.governor.limit_threads()
+        return self._preprocessor
+    
+    @property
+    def layout_parser(self):
+        
+        if self._layout_parser is None:
+            from .layout_parser import LayoutParser
+            self._layout_parser = LayoutParser()
+        return self._layout_parser
+    
+    def _tesseract(self):
+        
+        import pytesseract
+        
+        # Resolve the binary once, on first use rather than at construction
+        if not self._tesseract_ready:
+            with self._init_lock:
+                if not self._tesseract_ready:
+                    if self.tesseract_path:
+                        pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
+                    else:
+                        self._auto_detect_tesseract(pytesseract)
+                    self._tesseract_ready = True
+        
+        return pytesseract
+    
+    def _auto_detect_tesseract(self, pytesseract):
         
         # Common paths
         paths = [
@@ -49,16 +114,41 @@ class OCREngine:
         
         print("⚠ Tesseract not found. Please install or set TESSERACT_PATH environment variable")
     
+    def warm_up(self, languages=('eng',)):
+        
+        # Import the OCR stack and run a tiny recognition per language so the
+        # modules and traineddata are loaded before the first real request
+        import numpy as np
+        import pdf2image
+        from .preprocess import as_tesseract_image
+        
+        pytesseract = self._tesseract()
+        
+        # Building the helpers pulls in cv2 and numpy
+        self.preprocessor
+        self.layout_parser
+        
+        blank = as_tesseract_image(np.full((32, 64), 255, dtype=np.uint8))
+        for language in languages:
+            try:
+                pytesseract.image_to_string(blank, lang=language, config='--psm 7')
+            except Exception as e:
+                print(f"Warm-up failed for language {language}: {e}")
+    
     def check_tesseract(self):
         
         try:
-            version = pytesseract.get_tesseract_version()
+            version = self._tesseract().get_tesseract_version()
             return {'available': True, 'version': str(version)}
         except:
             return {'available': False, 'version': None}
     
-    def process_document(self, input_path, output_format='txt', output_folder='outputs', file_id='', language='eng'):
+    def process_document(self, input_path, output_format='txt', output_folder='outputs', file_id='', language='eng',
+                         client_id='', interactive=False, cost=None):
         
+        spool = None
+        checkpoint_token = None
+        completed = False
         try:
             print(f"Processing: {input_path} with language: {language}")
             
@@ -66,24 +156,96 @@ class OCREngine:
             if not os.path.exists(input_path):
                 return {'success': False, 'error': 'File not found'}
             
-            # Convert to images
-            images = self._convert_to_images(input_path)
+            # Count pages up front so the limit applies before any rasterization
+            page_count = self._count_pages(input_path)
             
-            if not images:
+            if not page_count:
                 return {'success': False, 'error': 'Failed to convert file to images'}
             
             # Check page limit
-            if len(images) > 50:
-                return {'success': False, 'error': f'Too many pages ({len(images)}). Maximum is 50 pages.'}
+            if page_count > 50:
+                return {'success': False, 'error': f'Too many pages ({page_count}). Maximum is 50 pages.'}
+            
+            print(f"Processing {page_count} page(s)...")
+            
+            # Resume from pages a previous attempt at this file already finished
+            checkpoint_key = None
+            done_pages = {}
+            if self.checkpoints:
+                checkpoint_key = self.checkpoints.key_for(input_path, language, profile=self.mode)
+                # Held until this job ends, so another job on the same file can't clear it underneath us
+                checkpoint_token = self.checkpoints.hold(checkpoint_key)
+                done_pages = self.checkpoints.load(checkpoint_key)
+                if done_pages:
+                    print(f"Resuming: {len(done_pages)}/{page_count} page(s) already done")
+            
+            # Searchable PDFs also need every page image: each is compressed once
+            # recognized and spooled to this job's own scratch folder (never the
+            # shared checkpoints) until the writer streams the PDF out.
+            # Checkpointed pages are rasterized again for their image, but not re-OCR'd
+            page_images = None
+            skip_pages = set(done_pages)
+            if output_format == 'pdf':
+                spool = tempfile.TemporaryDirectory(prefix='ocr_pages_')
+                page_images = spool.name
+                skip_pages = set()
+            
+            # Rasterize, preprocess, recognize and collect pages as overlapping stages
+            pages_by_num = dict(done_pages)
+            
+            def preprocess(page):
+                return self._preprocess_page(page, resize_only=page[0] in done_pages)
+            
+            def recognize(page):
+                if page[0] in done_pages:
+                    page_data = done_pages[page[0]]
+                else:
+                    page_data = self._recognize_page(page, language)
+                return (page_data, page[1]) if page_images else page_data
+            
+            def compress(item):
+                page_data, cv_image = item
+                self._spool_page_image(page_images, page_data['page_num'], cv_image)
+                return page_data
             
-            print(f"Processing {len(images)} page(s)...")
+            def collect(page_data):
+                if checkpoint_key and page_data['page_num'] not in done_pages:
+                    self.checkpoints.save(checkpoint_key, page_data)
+                pages_by_num[page_data['page_num']] = page_data
             
-            # Extract structured data from all pages
-            pages_data = []
-            for i, image in enumerate(images, 1):
-                print(f"OCR on page {i}/{len(images)}...")
-                page_data = self._extract_page_data(image, i, language)
-                pages_data.append(page_data)
+            stages = [('preprocess', preprocess), ('ocr', recognize)]
+            if page_images:
+                stages.append(('compress', compress))
+            pipeline = PagePipeline(stages=stages, queue_size=self.queue_size)
+            
+            # Preprocessing and Tesseract run concurrently, so a document holds two stages' worth of CPU
+            slots = self.governor.job_slots(concurrent_stages=2)
+            if cost is None:
+                cost = self.estimate_cost(input_path)['cost']
+            if not self.scheduler.acquire(slots, client_id=client_id, cost=cost,
+                                          interactive=interactive, timeout=self.admit_timeout):
+                return {'success': False, 'error': 'Server is busy. Please try again later.'}
+            try:
+                stage_stats = pipeline.run(
+                    'rasterize', self._iter_pages(input_path, page_count, skip_pages=skip_pages),
+                    'write', collect
+                )
+            except Exception as e:
+                print(f"Error processing document after {len(pages_by_num)}/{page_count} page(s): {e}")
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'pages': page_count,
+                    'completed_pages': len(pages_by_num),
+                    'resumable': checkpoint_key is not None
+                }
+            finally:
+                self.scheduler.release(slots)
+            
+            if not pages_by_num:
+                return {'success': False, 'error': 'Failed to convert file to images'}
+            
+            pages_data = [pages_by_num[page_num] for page_num in sorted(pages_by_num)]
             
             # Generate output based on format
             output_path = self._generate_output(
@@ -91,66 +253,215 @@ class OCREngine:
                 output_format=output_format,
                 output_folder=output_folder,
                 original_filename=Path(input_path).stem,
-                file_id=file_id
+                file_id=file_id,
+                page_images=page_images
             )
             
+            completed = True
+            
             return {
                 'success': True,
                 'output_path': output_path,
-                'pages': len(images)
+                'pages': len(pages_data),
+                'resumed_pages': len(done_pages),
+                'deduplicated_pages': sum(1 for page in pages_data if page.get('deduplicated')),
+                'stage_stats': stage_stats
             }
         
         except Exception as e:
             print(f"Error processing document: {str(e)}")
             return {'success': False, 'error': str(e)}
+        
+        finally:
+            if checkpoint_token:
+                self.checkpoints.release(checkpoint_key, checkpoint_token, clear=completed)
+            if spool is not None:
+                spool.cleanup()
     
-    def _convert_to_images(self, input_path):
+    def estimate_cost(self, input_path, profile='advanced'):
         
+        # Cheap pre-flight estimate from file headers only: pages x pixels x profile
         try:
-            file_ext = Path(input_path).suffix.lower()
-            
-            if file_ext == '.pdf':
-                # Convert PDF to images
-                images = pdf2image.convert_from_path(input_path, dpi=300)
-                return images
+            if Path(input_path).suffix.lower() == '.pdf':
+                import pdf2image
+                info = pdf2image.pdfinfo_from_path(input_path)
+                pages = int(info.get('Pages', 0))
+                # 'Page size' is e.g. '612 x 792 pts (letter)'; rendered at 300 DPI
+                size = str(info.get('Page size', '612 x 792')).split()
+                width = float(size[0]) / 72 * 300
+                height = float(size[2]) / 72 * 300
             else:
-                # Load single image
-                image = Image.open(input_path)
-                return [image]
+                from PIL import Image
+                # Multi-page TIFFs are costed like PDFs: first page size x page count
+                with Image.open(input_path) as image:
+                    width, height = image.size
+                    pages = self._frame_count(image)
+        except Exception as e:
+            print(f"Error estimating cost: {e}")
+            return {'pages': 0, 'megapixels': 0.0, 'cost': 0.0}
+        
+        # Mirror resize_for_ocr so the estimate matches what is actually processed
+        if height < 1000 or width < 1000:
+            width, height = width * 2.0, height * 2.0
+        elif height > 4000 or width > 4000:
+            width, height = width * 0.75, height * 0.75
+        
+        megapixels = pages * width * height / 1e6
+        return {
+            'pages': pages,
+            'megapixels': round(megapixels, 2),
+            'cost': round(megapixels * PROFILE_COST.get(profile, 1.0), 2)
+        }
+    
+    def _count_pages(self, input_path):
+        
+        try:
+            if Path(input_path).suffix.lower() == '.pdf':
+                import pdf2image
+                info = pdf2image.pdfinfo_from_path(input_path)
+                return int(info.get('Pages', 0))
+            
+            from PIL import Image
+            with Image.open(input_path) as image:
+                return self._frame_count(image)
         
         except Exception as e:
-            print(f"Error converting to images: {e}")
-            return []
+            print(f"Error reading page count: {e}")
+            return 0
+    
+    def _frame_count(self, image):
+        
+        # Only TIFF frames are pages; other multi-frame formats (MPO camera JPEGs,
+        # animated GIFs) are read as their first frame. n_frames walks the TIFF
+        # directories without decoding any pixels
+        if image.format == 'TIFF':
+            return getattr(image, 'n_frames', 1)
+        return 1
+    
+    def _iter_pages(self, input_path, page_count, skip_pages=()):
+        
+        import pdf2image
+        from PIL import Image
+        
+        file_ext = Path(input_path).suffix.lower()
+        
+        if file_ext == '.pdf':
+            # One pdftoppm call per page so rendering overlaps with OCR
+            for page_num in range(1, page_count + 1):
+                if page_num in skip_pages:
+                    continue
+                images = pdf2image.convert_from_path(
+                    input_path,
+                    dpi=300,
+                    grayscale=True,
+                    first_page=page_num,
+                    last_page=page_num
+                )
+                for image in images:
+                    yield page_num, image
+        else:
+            # Images, including multi-page TIFFs, are decoded one frame at a time
+            with Image.open(input_path) as image:
+                for page_num in range(1, min(page_count, self._frame_count(image)) + 1):
+                    if page_num in skip_pages:
+                        continue
+                    image.seek(page_num - 1)
+                    # Detach the frame as grayscale; the next seek reuses the open image
+                    frame = image.convert('L') if image.mode != 'L' else image.copy()
+                    
+                    # Fax pages often have non-square pixels (e.g. 204x98 DPI); stretch
+                    # them square so the text has its true shape
+                    xdpi, ydpi = (float(value or 0) for value in frame.info.get('dpi', (0, 0)))
+                    if xdpi and ydpi and abs(xdpi - ydpi) > 1:
+                        frame = frame.resize((frame.width, round(frame.height * xdpi / ydpi)), Image.BILINEAR)
+                        frame.info['dpi'] = (xdpi, xdpi)
+                    
+                    yield page_num, frame
     
     def _extract_page_data(self, pil_image, page_num, language='eng'):
         
-        # Convert PIL to OpenCV
-        cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        return self._recognize_page(self._preprocess_page((page_num, pil_image)), language)
+    
+    def _preprocess_page(self, page, resize_only=False):
+        
+        import numpy as np
+        
+        page_num, pil_image = page
+        
+        # View the grayscale page as a single-channel OpenCV image
+        cv_image = np.asarray(pil_image)
         
         # Resize for optimal OCR
         cv_image = self.preprocessor.resize_for_ocr(cv_image)
         
-        # Preprocess with advanced method
-        processed = self.preprocessor.preprocess(cv_image, method='advanced')
+        # Resolution of the resized image; PDFs are rendered at 300 DPI and
+        # images without a usable DPI tag are assumed to be 300 DPI scans
+        dpi = float(pil_image.info.get('dpi', (300, 300))[0] or 300)
+        if not 50 <= dpi <= 2400:
+            dpi = 300.0
+        dpi *= cv_image.shape[1] / pil_image.width
         
-        # Convert back to PIL
-        pil_processed = Image.fromarray(processed)
+        if resize_only:
+            return page_num, cv_image, None, None, dpi
         
-        # Use better Tesseract config for higher accuracy
-        # PSM 3 = Fully automatic page segmentation (better for documents)
-        # OEM 3 = Default OCR Engine Mode (LSTM neural networks)
-        custom_config = r'--oem 3 --psm 3'
+        # Preprocess with advanced method; the cascade defers that to weak regions
+        if self.mode == 'cascade':
+            processed = cv_image
+        else:
+            processed = self.preprocessor.preprocess(cv_image, method='advanced')
         
-        # Extract text with enhanced config
-        text = pytesseract.image_to_string(pil_processed, lang=language, config=custom_config)
+        # Hash the page Tesseract will see here so the OCR stage only does the lookup
+        fingerprint = self.dedup_index.fingerprint(processed) if self.dedup_index else None
         
-        # Get detailed data for layout with same config
-        data = pytesseract.image_to_data(
-            pil_processed, 
-            lang=language, 
-            config=custom_config,
-            output_type=pytesseract.Output.DICT
-        )
+        return page_num, cv_image, processed, fingerprint, dpi
+    
+    def _recognize_page(self, page, language='eng'):
+        
+        from .preprocess import as_tesseract_image
+        
+        page_num, cv_image, processed, fingerprint, dpi = page
+        
+        # Identical page already recognized (in this document or a recent one)
+        if fingerprint is not None:
+            cached = self.dedup_index.lookup(fingerprint, f"{language}:{self.mode}")
+            if cached is not None:
+                print(f"Page {page_num} matches an earlier page, reusing its OCR")
+                # Geometry belongs to this page, not to the one first recognized
+                return dict(
+                    cached,
+                    page_num=page_num,
+                    deduplicated=True,
+                    width=int(cv_image.shape[1]),
+                    height=int(cv_image.shape[0]),
+                    dpi=round(dpi, 2)
+                )
+        
+        print(f"OCR on page {page_num}...")
+        
+        cascade_stats = None
+        if self.mode == 'cascade':
+            text, data, cascade_stats = self._cascade_ocr(processed, language)
+        else:
+            pytesseract = self._tesseract()
+            
+            # Wrap the buffer for Tesseract without re-encoding it as PNG
+            pil_processed = as_tesseract_image(processed)
+            
+            # Use better Tesseract config for higher accuracy
+            # PSM 3 = Fully automatic page segmentation (better for documents)
+            # OEM 3 = Default OCR Engine Mode (LSTM neural networks)
+            custom_config = r'--oem 3 --psm 3'
+            
+            # Extract text with enhanced config
+            text = pytesseract.image_to_string(pil_processed, lang=language, config=custom_config)
+            
+            # Get detailed data for layout with same config
+            data = pytesseract.image_to_data(
+                pil_processed, 
+                lang=language, 
+                config=custom_config,
+                output_type=pytesseract.Output.DICT
+            )
         
         # Detect tables
         tables = self.layout_parser.detect_tables(cv_image)
@@ -158,15 +469,188 @@ class OCREngine:
         # Parse layout structure
         blocks = self.layout_parser.parse_layout(data)
         
-        return {
+        page_data = {
             'page_num': page_num,
             'text': text,
             'blocks': blocks,
             'tables': tables,
-            'data': data
+            'data': data,
+            # Size of the image the boxes in 'data' refer to (after resize_for_ocr)
+            'width': int(cv_image.shape[1]),
+            'height': int(cv_image.shape[0]),
+            'dpi': round(dpi, 2)
+        }
+        if cascade_stats is not None:
+            page_data['cascade'] = cascade_stats
+        
+        if fingerprint is not None:
+            self.dedup_index.add(fingerprint, f"{language}:{self.mode}", page_data)
+        
+        return page_data
+    
+    def _cascade_ocr(self, gray, language):
+        
+        from .preprocess import as_tesseract_image
+        
+        pytesseract = self._tesseract()
+        
+        # Cheap pass: one Tesseract call on the raw grayscale page gives words, boxes and confidences
+        data = pytesseract.image_to_data(
+            as_tesseract_image(gray),
+            lang=language,
+            config=r'--oem 3 --psm 3',
+            output_type=pytesseract.Output.DICT
+        )
+        lines = self._group_lines(data)
+        
+        # Runs of weak lines within a block are re-OCR'd together as one region
+        regions = []
+        for idx, line in enumerate(lines):
+            if line['conf'] >= self.cascade_min_conf:
+                continue
+            if regions and regions[-1]['end'] == idx and lines[idx - 1]['block'] == line['block']:
+                regions[-1]['end'] = idx + 1
+            else:
+                regions.append({'start': idx, 'end': idx + 1})
+        
+        improved = 0
+        replacements = {}
+        for region in regions:
+            region_lines = lines[region['start']:region['end']]
+            x0, y0, x1, y1 = self._lines_box(region_lines, gray.shape)
+            
+            # Expensive pass, on the crop only
+            crop = self.preprocessor.preprocess(gray[y0:y1, x0:x1], method='advanced')
+            region_data = pytesseract.image_to_data(
+                as_tesseract_image(crop),
+                lang=language,
+                config=r'--oem 3 --psm 6',
+                output_type=pytesseract.Output.DICT
+            )
+            new_lines = self._group_lines(region_data, offset=(x0, y0))
+            
+            # Keep whichever reading Tesseract is more confident in
+            old_conf = self._mean_conf(region_lines)
+            if new_lines and self._mean_conf(new_lines) > old_conf:
+                for line in new_lines:
+                    line['block'] = region_lines[0]['block']
+                    line['par'] = region_lines[0]['par']
+                replacements[region['start']] = (region['end'], new_lines)
+                improved += 1
+        
+        merged = []
+        idx = 0
+        while idx < len(lines):
+            if idx in replacements:
+                end, new_lines = replacements[idx]
+                merged.extend(new_lines)
+                idx = end
+            else:
+                merged.append(lines[idx])
+                idx += 1
+        
+        stats = {
+            'lines': len(lines),
+            'low_confidence_lines': sum(region['end'] - region['start'] for region in regions),
+            'regions': len(regions),
+            'improved_regions': improved
         }
+        return self._lines_to_text(merged), self._lines_to_data(merged), stats
+    
+    def _group_lines(self, data, offset=(0, 0)):
+        
+        # Collapse Tesseract's word rows into lines, keeping boxes and confidences
+        lines = []
+        current_key = None
+        dx, dy = offset
+        
+        for i in range(len(data.get('text', []))):
+            text = str(data['text'][i]).strip()
+            if data['level'][i] != 5 or not text:
+                continue
+            
+            try:
+                conf = float(data['conf'][i])
+            except (ValueError, TypeError):
+                conf = 0.0
+            
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            if key != current_key:
+                lines.append({'block': key[0], 'par': key[1], 'words': [], 'conf': 0.0})
+                current_key = key
+            
+            lines[-1]['words'].append({
+                'text': text,
+                'conf': conf,
+                'left': data['left'][i] + dx,
+                'top': data['top'][i] + dy,
+                'width': data['width'][i],
+                'height': data['height'][i]
+            })
+        
+        for line in lines:
+            line['conf'] = self._mean_conf([line])
+        
+        return lines
+    
+    def _mean_conf(self, lines):
+        
+        confs = [word['conf'] for line in lines for word in line['words']]
+        return sum(confs) / len(confs) if confs else 0.0
+    
+    def _lines_box(self, lines, shape):
+        
+        words = [word for line in lines for word in line['words']]
+        x0 = min(word['left'] for word in words)
+        y0 = min(word['top'] for word in words)
+        x1 = max(word['left'] + word['width'] for word in words)
+        y1 = max(word['top'] + word['height'] for word in words)
+        
+        # Pad so glyph edges and the local background survive the crop
+        pad = max(8, int(0.3 * max(word['height'] for word in words)))
+        height, width = shape[:2]
+        return max(0, x0 - pad), max(0, y0 - pad), min(width, x1 + pad), min(height, y1 + pad)
+    
+    def _lines_to_text(self, lines):
+        
+        # Mirror image_to_string: one line per row, blank line between paragraphs
+        out = []
+        last_par = None
+        for line in lines:
+            par = (line['block'], line['par'])
+            if last_par is not None and par != last_par:
+                out.append('')
+            out.append(' '.join(word['text'] for word in line['words']))
+            last_par = par
+        return '\n'.join(out) + '\n'
     
-    def _generate_output(self, pages_data, output_format, output_folder, original_filename, file_id):
+    def _lines_to_data(self, lines):
+        
+        # Rebuild an image_to_data style dict (word rows only) from merged lines
+        keys = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                'left', 'top', 'width', 'height', 'conf', 'text']
+        data = {key: [] for key in keys}
+        
+        for line_num, line in enumerate(lines, 1):
+            for word_num, word in enumerate(line['words'], 1):
+                data['level'].append(5)
+                data['page_num'].append(1)
+                data['block_num'].append(line['block'])
+                data['par_num'].append(line['par'])
+                data['line_num'].append(line_num)
+                data['word_num'].append(word_num)
+                data['left'].append(word['left'])
+                data['top'].append(word['top'])
+                data['width'].append(word['width'])
+                data['height'].append(word['height'])
+                # Whole numbers, as image_to_data reports them; LayoutParser drops anything else
+                data['conf'].append(int(round(word['conf'])))
+                data['text'].append(word['text'])
+        
+        return data
+    
+    def _generate_output(self, pages_data, output_format, output_folder, original_filename, file_id,
+                         page_images=None):
         
         
         # Create output filename
@@ -179,9 +663,188 @@ class OCREngine:
             self._generate_docx(pages_data, output_path)
         elif output_format == 'xlsx':
             self._generate_xlsx(pages_data, output_path)
+        elif output_format == 'jsonl':
+            self._generate_jsonl(pages_data, output_path)
+        elif output_format == 'hocr':
+            self._generate_hocr(pages_data, output_path)
+        elif output_format == 'pdf':
+            self._generate_pdf(pages_data, output_path, page_images)
         
         return output_path
     
+    def _page_structure(self, page):
+        
+        # Blocks -> lines -> words with boxes and confidences, straight from the
+        # in-memory image_to_data results (works for full and cascade pages)
+        blocks = []
+        for line in self._group_lines(page['data']):
+            words = [
+                {
+                    'text': word['text'],
+                    'conf': round(word['conf'], 2),
+                    'bbox': [word['left'], word['top'], word['left'] + word['width'], word['top'] + word['height']]
+                }
+                for word in line['words']
+            ]
+            line_entry = {
+                'par': line['par'],
+                'text': ' '.join(word['text'] for word in words),
+                'conf': round(line['conf'], 2),
+                'bbox': self._union_bbox([word['bbox'] for word in words]),
+                'words': words
+            }
+            if not blocks or blocks[-1]['block'] != line['block']:
+                blocks.append({'block': line['block'], 'lines': []})
+            blocks[-1]['lines'].append(line_entry)
+        
+        for block in blocks:
+            block['bbox'] = self._union_bbox([line['bbox'] for line in block['lines']])
+            block['conf'] = round(self._mean_conf([
+                {'words': [{'conf': word['conf']} for word in line['words']]} for line in block['lines']
+            ]), 2)
+        
+        # Pages checkpointed before sizes were recorded fall back to the text extent
+        width = page.get('width') or max([block['bbox'][2] for block in blocks] or [0])
+        height = page.get('height') or max([block['bbox'][3] for block in blocks] or [0])
+        return width, height, blocks
+    
+    def _union_bbox(self, boxes):
+        
+        return [
+            min(box[0] for box in boxes),
+            min(box[1] for box in boxes),
+            max(box[2] for box in boxes),
+            max(box[3] for box in boxes)
+        ]
+    
+    def _generate_jsonl(self, pages_data, output_path):
+        
+        # One JSON object per page, written as each page is serialized
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for page in pages_data:
+                width, height, blocks = self._page_structure(page)
+                record = {
+                    'page': page['page_num'],
+                    'width': width,
+                    'height': height,
+                    'text': page['text'],
+                    'blocks': blocks,
+                    'tables': page['tables']
+                }
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+                f.write('\n')
+        
+        print(f"✓ JSONL saved: {output_path}")
+    
+    def _generate_hocr(self, pages_data, output_path):
+        
+        def title(bbox, conf=None):
+            value = f"bbox {bbox[0]} {bbox[1]} {bbox[2]} {bbox[3]}"
+            return value if conf is None else f"{value}; x_wconf {int(round(conf))}"
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" '
+                '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">\n'
+                '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">\n'
+                ' <head>\n'
+                '  <title></title>\n'
+                '  <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>\n'
+                '  <meta name="ocr-system" content="tesseract"/>\n'
+                '  <meta name="ocr-capabilities" content="ocr_page ocr_carea ocr_par ocr_line ocrx_word"/>\n'
+                ' </head>\n'
+                ' <body>\n'
+            )
+            
+            for page in pages_data:
+                p = page['page_num']
+                width, height, blocks = self._page_structure(page)
+                f.write(f'  <div class="ocr_page" id="page_{p}" title="bbox 0 0 {width} {height}; ppageno {p - 1}">\n')
+                
+                for b, block in enumerate(blocks, 1):
+                    f.write(f'   <div class="ocr_carea" id="block_{p}_{b}" title="{title(block["bbox"])}">\n')
+                    
+                    # Paragraphs are consecutive lines sharing a par number
+                    pars = []
+                    for line in block['lines']:
+                        if not pars or pars[-1][0]['par'] != line['par']:
+                            pars.append([])
+                        pars[-1].append(line)
+                    
+                    for n, par in enumerate(pars, 1):
+                        par_bbox = self._union_bbox([line['bbox'] for line in par])
+                        f.write(f'    <p class="ocr_par" id="par_{p}_{b}_{n}" title="{title(par_bbox)}">\n')
+                        for line in par:
+                            f.write(f'     <span class="ocr_line" title="{title(line["bbox"])}">')
+                            f.write(' '.join(
+                                f'<span class="ocrx_word" title="{title(word["bbox"], word["conf"])}">'
+                                f'{html.escape(word["text"])}</span>'
+                                for word in line['words']
+                            ))
+                            f.write('</span>\n')
+                        f.write('    </p>\n')
+                    
+                    f.write('   </div>\n')
+                
+                f.write('  </div>\n')
+            
+            f.write(' </body>\n</html>\n')
+        
+        print(f"✓ hOCR saved: {output_path}")
+    
+    def _page_image_path(self, folder, page_num):
+        
+        return os.path.join(folder, f"page_{page_num:04d}.jpg")
+    
+    def _spool_page_image(self, folder, page_num, cv_image):
+        
+        import cv2
+        
+        ok, encoded = cv2.imencode('.jpg', cv_image, [cv2.IMWRITE_JPEG_QUALITY, PDF_JPEG_QUALITY])
+        if not ok:
+            raise ValueError(f"Could not compress page {page_num}")
+        
+        with open(self._page_image_path(folder, page_num), 'wb') as f:
+            f.write(encoded.tobytes())
+    
+    def _generate_pdf(self, pages_data, output_path, page_images):
+        
+        from PIL import Image
+        from .pdf_writer import SearchablePDFWriter
+        
+        # Each page is the spooled image with its recognized words laid over it
+        # as invisible text, written one page at a time; nothing is OCR'd again
+        writer = SearchablePDFWriter(output_path)
+        try:
+            for page in pages_data:
+                image_path = self._page_image_path(page_images, page['page_num'])
+                with Image.open(image_path) as image:
+                    image_width, image_height = image.size
+                with open(image_path, 'rb') as f:
+                    jpeg_data = f.read()
+                
+                _, _, blocks = self._page_structure(page)
+                words = [
+                    (word['text'], word['bbox'])
+                    for block in blocks for line in block['lines'] for word in line['words']
+                ]
+                
+                # Boxes are in the recognized image's pixels (the spooled image, for
+                # checkpoints that predate recorded sizes); the page keeps its physical size
+                width = page.get('width') or image_width
+                height = page.get('height') or image_height
+                dpi = page.get('dpi') or 300
+                writer.add_page(
+                    jpeg_data, image_width, image_height,
+                    width * 72.0 / dpi, height * 72.0 / dpi,
+                    words, box_size=(width, height)
+                )
+        finally:
+            writer.close()
+        
+        print(f"✓ PDF saved: {output_path}")
+    
     def _generate_txt(self, pages_data, output_path):
         
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -224,6 +887,9 @@ class OCREngine:
     
     def _generate_docx(self, pages_data, output_path):
         
+        from docx import Document
+        from docx.shared import Pt
+        
         doc = Document()
         
         # Set default font and spacing
@@ -318,10 +984,7 @@ class OCREngine:
                             table = doc.add_table(rows=len(table_data['rows']), cols=max_cols)
                             table.style = 'Light Grid Accent 1'
                             
-                            for i, row_data in enumerate(table_data['rows']):
-                                for j, cell_text in enumerate(row_data):
-                                    if j < max_cols:
-                                        table.rows[i].cells[j].text = str(cell_text)
+                            self._fill_docx_table(table, table_data['rows'], max_cols)
                             
                             # Add spacing after table
                             doc.add_paragraph()
@@ -330,62 +993,64 @@ class OCREngine:
                     continue
             
             # Page break (except last page)
-            if page != pages_data[-1]:
+            if page_idx < len(pages_data) - 1:
                 doc.add_page_break()
         
         doc.save(output_path)
         print(f"✓ DOCX saved: {output_path}")
     
+    def _fill_docx_table(self, table, rows, max_cols):
+        
+        # Walk the <w:tr>/<w:tc> elements once instead of table.rows[i].cells[j],
+        # which rebuilds the whole cell grid on every access. A fresh table's
+        # cell holds one empty paragraph, so appending a run matches cell.text.
+        for tr, row_data in zip(table._tbl.tr_lst, rows):
+            for tc, cell_text in zip(tr.tc_lst, row_data[:max_cols]):
+                tc.p_lst[0].add_r().text = str(cell_text)
+    
     def _generate_xlsx(self, pages_data, output_path):
         
+        from openpyxl import Workbook
+        
         try:
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                for page in pages_data:
-                    sheet_name = f"Page_{page['page_num']}"
-                    
-                    # If tables detected, write them
-                    if page['tables']:
-                        row_offset = 0
-                        for table_idx, table in enumerate(page['tables']):
-                            try:
-                                if table.get('rows') and len(table['rows']) > 0:
-                                    # Get max columns to handle uneven rows
-                                    max_cols = max(len(row) for row in table['rows'])
-                                    
-                                    # Pad rows to have equal length
-                                    padded_rows = []
-                                    for row in table['rows']:
-                                        padded_row = list(row) + [''] * (max_cols - len(row))
-                                        padded_rows.append(padded_row)
-                                    
-                                    df = pd.DataFrame(padded_rows)
-                                    df.to_excel(
-                                        writer, 
-                                        sheet_name=sheet_name, 
-                                        startrow=row_offset, 
-                                        index=False, 
-                                        header=False
-                                    )
-                                    row_offset += len(padded_rows) + 2
-                            except Exception as e:
-                                print(f"Error writing table to Excel: {e}")
-                                continue
-                    else:
-                        # No tables - write text as single column
+            # Write-only mode streams each row to disk as it is appended
+            workbook = Workbook(write_only=True)
+            
+            for page in pages_data:
+                sheet = workbook.create_sheet(title=f"Page_{page['page_num']}")
+                
+                # If tables detected, write them
+                if page['tables']:
+                    first_table = True
+                    for table in page['tables']:
                         try:
-                            text_lines = [line.strip() for line in page['text'].split('\n') if line.strip()]
-                            if text_lines:
-                                df = pd.DataFrame({'Content': text_lines})
-                                df.to_excel(writer, sheet_name=sheet_name, index=False)
+                            if table.get('rows') and len(table['rows']) > 0:
+                                # Two blank rows between consecutive tables
+                                if not first_table:
+                                    sheet.append([])
+                                    sheet.append([])
+                                first_table = False
+                                
+                                for row in table['rows']:
+                                    sheet.append(list(row))
                         except Exception as e:
-                            print(f"Error writing text to Excel: {e}")
-                            # Create empty sheet
-                            df = pd.DataFrame({'Content': ['No content extracted']})
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
+                            print(f"Error writing table to Excel: {e}")
+                            continue
+                else:
+                    # No tables - write text as single column
+                    sheet.append(['Content'])
+                    for line in page['text'].split('\n'):
+                        line = line.strip()
+                        if line:
+                            sheet.append([line])
             
+            workbook.save(output_path)
             print(f"✓ Excel saved: {output_path}")
         except Exception as e:
             print(f"Error generating Excel file: {e}")
             # Create a simple fallback file
-            df = pd.DataFrame({'Error': ['Failed to generate Excel file']})
-            df.to_excel(output_path, index=False)
\ No newline at end of file
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(['Error'])
+            sheet.append(['Failed to generate Excel file'])
+            workbook.save(output_path)
@@ -0,0 +1,176 @@
+import struct
+import zlib
+
+
+# Objects written up front; pages follow from object 9 onwards
+_CATALOG, _PAGES, _FONT, _CID_FONT, _TO_UNICODE, _DESCRIPTOR, _FONT_FILE, _CID_TO_GID = range(1, 9)
+
+
+def _glyphless_font():
+
+    # The smallest TrueType font strict readers accept: .notdef plus one empty
+    # glyph, both half an em wide. Only the tables PDF requires are present
+    tables = {
+        b'head': struct.pack(
+            '>IIIIHHqqhhhhHHhhh', 0x00010000, 0x00010000, 0, 0x5F0F3CF5, 0x000B, 1000,
+            0, 0, 0, 0, 500, 1000, 0, 3, 2, 0, 0
+        ),
+        b'hhea': struct.pack('>IhhhHhhhhhhhhhhhH', 0x00010000, 1000, 0, 0, 500, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 2),
+        b'maxp': struct.pack('>I14H', 0x00010000, 2, 0, 0, 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0),
+        b'hmtx': struct.pack('>HhHh', 500, 0, 500, 0),
+        b'loca': struct.pack('>3H', 0, 0, 0),
+        b'glyf': b'',
+        b'post': struct.pack('>IiHhIIIII', 0x00030000, 0, -100 & 0xFFFF, 50, 0, 0, 0, 0, 0),
+    }
+
+    def checksum(data):
+        data += b'\0' * (-len(data) % 4)
+        return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+    # Table directory, then each table padded to four bytes
+    header = struct.pack('>IHHHH', 0x00010000, len(tables), 64, 2, len(tables) * 16 - 64)
+    offset = len(header) + 16 * len(tables)
+    directory, body = [], []
+    for tag in sorted(tables):
+        data = tables[tag]
+        directory.append(struct.pack('>4sIII', tag, checksum(data), offset, len(data)))
+        body.append(data + b'\0' * (-len(data) % 4))
+        offset += len(body[-1])
+    font = bytearray(header + b''.join(directory) + b''.join(body))
+
+    # head.checkSumAdjustment balances the checksum of the whole file
+    head_offset = struct.unpack_from('>I', directory[sorted(tables).index(b'head')], 8)[0]
+    struct.pack_into('>I', font, head_offset + 8, (0xB1B0AFBA - checksum(bytes(font))) & 0xFFFFFFFF)
+    return bytes(font)
+
+
+class SearchablePDFWriter:
+
+
+    def __init__(self, path):
+
+        # Pages are appended as they arrive, so only byte offsets stay in memory
+        self.path = path
+        self._file = open(path, 'wb')
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = _CID_TO_GID + 1
+
+        self._file.write(b'%PDF-1.5\n%\xe2\xe3\xcf\xd3\n')
+        self._write_font()
+
+    def add_page(self, jpeg_data, image_width, image_height, width_pt, height_pt, words, box_size=None):
+
+        # words: (text, (x0, y0, x1, y1)) in pixels of an image sized box_size
+        box_width, box_height = box_size or (image_width, image_height)
+        sx = width_pt / box_width
+        sy = height_pt / box_height
+
+        image_id = self._reserve()
+        content_id = self._reserve()
+        page_id = self._reserve()
+
+        self._write_stream(image_id, (
+            f'<< /Type /XObject /Subtype /Image /Width {image_width} /Height {image_height} '
+            f'/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /DCTDecode'
+        ), jpeg_data)
+
+        # The page image fills the page; the text is drawn invisibly (3 Tr) on top
+        ops = [f'q {width_pt:.2f} 0 0 {height_pt:.2f} 0 0 cm /Im0 Do Q', 'BT 3 Tr']
+        for text, (x0, y0, x1, y1) in words:
+            encoded = self._encode_text(text)
+            if not encoded or x1 <= x0 or y1 <= y0:
+                continue
+            size = (y1 - y0) * sy
+            # Every glyph is half an em wide, so horizontal scaling stretches the word over its box
+            scale = 100.0 * (x1 - x0) * sx / (len(encoded) // 4 * 0.5 * size)
+            ops.append(
+                f'/F1 {size:.2f} Tf {scale:.2f} Tz 1 0 0 1 {x0 * sx:.2f} {height_pt - y1 * sy:.2f} Tm '
+                f'<{encoded}> Tj'
+            )
+        ops.append('ET')
+        self._write_stream(content_id, '<< /Filter /FlateDecode', zlib.compress('\n'.join(ops).encode('ascii')))
+
+        self._write_object(page_id, (
+            f'<< /Type /Page /Parent {_PAGES} 0 R /MediaBox [0 0 {width_pt:.2f} {height_pt:.2f}] '
+            f'/Resources << /XObject << /Im0 {image_id} 0 R >> /Font << /F1 {_FONT} 0 R >> >> '
+            f'/Contents {content_id} 0 R >>'
+        ))
+        self._page_ids.append(page_id)
+
+    def close(self):
+
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(_PAGES, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>')
+        self._write_object(_CATALOG, f'<< /Type /Catalog /Pages {_PAGES} 0 R >>')
+
+        xref_offset = self._file.tell()
+        lines = [f'xref\n0 {self._next_id}\n', '0000000000 65535 f \n']
+        for obj_id in range(1, self._next_id):
+            lines.append(f'{self._offsets[obj_id]:010d} 00000 n \n')
+        lines.append(f'trailer\n<< /Size {self._next_id} /Root {_CATALOG} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n')
+        self._file.write(''.join(lines).encode('ascii'))
+        self._file.close()
+
+    def _write_font(self):
+
+        # A glyphless CID font: the text only has to be selectable and searchable,
+        # and Identity-H with CID = UTF-16 code unit covers every OCR language
+        self._write_object(_FONT, (
+            f'<< /Type /Font /Subtype /Type0 /BaseFont /GlyphLessFont /Encoding /Identity-H '
+            f'/DescendantFonts [{_CID_FONT} 0 R] /ToUnicode {_TO_UNICODE} 0 R >>'
+        ))
+        self._write_object(_CID_FONT, (
+            f'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /GlyphLessFont '
+            f'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+            f'/FontDescriptor {_DESCRIPTOR} 0 R /DW 500 /CIDToGIDMap {_CID_TO_GID} 0 R >>'
+        ))
+        # Every CID draws the font's single (empty) glyph
+        self._write_stream(_CID_TO_GID, '<< /Filter /FlateDecode', zlib.compress(b'\x00\x01' * 65536, 9))
+
+        # bfrange entries may not cross a 256-code boundary, and at most 100 per block
+        ranges = [f'<{hi:02X}00> <{hi:02X}FF> <{hi:02X}00>' for hi in range(256) if not 0xD8 <= hi <= 0xDF]
+        blocks = []
+        for start in range(0, len(ranges), 100):
+            chunk = ranges[start:start + 100]
+            blocks.append(f'{len(chunk)} beginbfrange\n' + '\n'.join(chunk) + '\nendbfrange')
+        cmap = (
+            '/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n'
+            '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n'
+            '/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n'
+            '1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n'
+            + '\n'.join(blocks) +
+            '\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend\n'
+        )
+        self._write_stream(_TO_UNICODE, '<< /Filter /FlateDecode', zlib.compress(cmap.encode('ascii')))
+
+        self._write_object(_DESCRIPTOR, (
+            '<< /Type /FontDescriptor /FontName /GlyphLessFont /Flags 5 /FontBBox [0 0 500 1000] '
+            f'/ItalicAngle 0 /Ascent 1000 /Descent 0 /CapHeight 1000 /StemV 80 /FontFile2 {_FONT_FILE} 0 R >>'
+        ))
+        font = _glyphless_font()
+        self._write_stream(_FONT_FILE, f'<< /Length1 {len(font)}', font)
+
+    def _encode_text(self, text):
+
+        # Characters outside the BMP have no single CID and are dropped
+        return ''.join(f'{ord(char):04X}' for char in text if ord(char) <= 0xFFFF and not 0xD800 <= ord(char) <= 0xDFFF)
+
+    def _reserve(self):
+
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body):
+
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f'{obj_id} 0 obj\n{body}\nendobj\n'.encode('ascii'))
+
+    def _write_stream(self, obj_id, dictionary, data):
+
+        # dictionary is left open so /Length can be appended
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f'{obj_id} 0 obj\n{dictionary} /Length {len(data)} >>\nstream\n'.encode('ascii'))
+        self._file.write(data)
+        self._file.write(b'\nendstream\nendobj\n')
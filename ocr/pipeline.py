@@ -0,0 +1,148 @@
+import queue
+import threading
+import time
+
+
+_DONE = object()
+
+
+class PagePipeline:
+
+
+    def __init__(self, stages, queue_size=2, poll_interval=0.1):
+
+        # stages: ordered list of (name, func); each func maps one item to the next
+        self.stages = stages
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.stats = {}
+
+    def run(self, source_name, source, sink_name, sink):
+
+        abort = threading.Event()
+        errors = []
+        names = [source_name] + [name for name, _ in self.stages] + [sink_name]
+        self.stats = {
+            name: {'items': 0, 'busy': 0.0, 'waiting': 0.0, 'utilisation': 0.0}
+            for name in names
+        }
+
+        # Bounded queues between stages cap the number of pages in flight
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+
+        threads = [threading.Thread(
+            target=self._run_source,
+            args=(source_name, source, queues[0], abort, errors),
+            daemon=True
+        )]
+        for idx, (name, func) in enumerate(self.stages):
+            threads.append(threading.Thread(
+                target=self._run_stage,
+                args=(name, func, queues[idx], queues[idx + 1], abort, errors),
+                daemon=True
+            ))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        # The sink runs on the calling thread
+        try:
+            self._run_sink(sink_name, sink, queues[-1], abort)
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+
+        for thread in threads:
+            thread.join()
+
+        wall = time.perf_counter() - start
+        for stage in self.stats.values():
+            stage['busy'] = round(stage['busy'], 4)
+            stage['waiting'] = round(stage['waiting'], 4)
+            stage['utilisation'] = round(stage['busy'] / wall, 3) if wall > 0 else 0.0
+
+        if errors:
+            raise errors[0]
+
+        return self.stats
+
+    def _run_source(self, name, source, out_queue, abort, errors):
+
+        stats = self.stats[name]
+        try:
+            iterator = iter(source)
+            while not abort.is_set():
+                t0 = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats['busy'] += time.perf_counter() - t0
+                stats['items'] += 1
+                if not self._put(out_queue, item, abort, stats):
+                    return
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            self._put(out_queue, _DONE, abort, stats)
+
+    def _run_stage(self, name, func, in_queue, out_queue, abort, errors):
+
+        stats = self.stats[name]
+        try:
+            while True:
+                item = self._get(in_queue, abort, stats)
+                if item is _DONE:
+                    break
+                t0 = time.perf_counter()
+                result = func(item)
+                stats['busy'] += time.perf_counter() - t0
+                stats['items'] += 1
+                if not self._put(out_queue, result, abort, stats):
+                    return
+        except Exception as e:
+            errors.append(e)
+            abort.set()
+        finally:
+            self._put(out_queue, _DONE, abort, stats)
+
+    def _run_sink(self, name, sink, in_queue, abort):
+
+        stats = self.stats[name]
+        while True:
+            item = self._get(in_queue, abort, stats)
+            if item is _DONE:
+                return
+            t0 = time.perf_counter()
+            sink(item)
+            stats['busy'] += time.perf_counter() - t0
+            stats['items'] += 1
+
+    def _get(self, in_queue, abort, stats):
+
+        t0 = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return in_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    if abort.is_set():
+                        return _DONE
+        finally:
+            stats['waiting'] += time.perf_counter() - t0
+
+    def _put(self, out_queue, item, abort, stats):
+
+        t0 = time.perf_counter()
+        try:
+            while True:
+                try:
+                    out_queue.put(item, timeout=self.poll_interval)
+                    return True
+                except queue.Full:
+                    if abort.is_set():
+                        return False
+        finally:
+            stats['waiting'] += time.perf_counter() - t0
@@ -1,5 +1,19 @@
 import cv2
 import numpy as np
+from PIL import Image
+
+
+def as_tesseract_image(image):
+    
+    # Zero-copy view of a contiguous 8-bit buffer; Pillow's PPM writer emits
+    # raw PGM/PPM, so pytesseract skips the zlib encode of its PNG hand-off
+    if len(image.shape) == 2 and image.dtype == np.uint8:
+        image = np.ascontiguousarray(image)
+        pil_image = Image.frombuffer('L', (image.shape[1], image.shape[0]), image, 'raw', 'L', 0, 1)
+    else:
+        pil_image = Image.fromarray(image)
+    pil_image.format = 'PPM'
+    return pil_image
 
 
 class ImagePreprocessor:
@@ -11,7 +25,7 @@ class ImagePreprocessor:
         if len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         else:
-            gray = image.copy()
+            gray = image
         
         # Use advanced preprocessing by default for better quality
         if method == 'advanced':
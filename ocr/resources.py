@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+
+
+class ResourceGovernor:
+
+
+    def __init__(self, cpu_budget=None, threads_per_job=1):
+
+        # CPU slots this process may keep busy with OCR work at once
+        self.cpu_budget = max(1, int(cpu_budget or os.cpu_count() or 1))
+        # Threads each Tesseract/OpenCV call may use internally
+        self.threads_per_job = max(1, int(threads_per_job))
+
+        # Queueing (waits, timeouts) is the scheduler's job; this only counts slots
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._admitted = 0
+        self._opencv_limited = False
+
+        self.limit_threads()
+
+    def limit_threads(self):
+
+        # Tesseract is a subprocess and inherits the environment on each call
+        os.environ['OMP_THREAD_LIMIT'] = str(self.threads_per_job)
+
+        # Only touch OpenCV once something else has imported it
+        if not self._opencv_limited:
+            cv2 = sys.modules.get('cv2')
+            if cv2 is not None:
+                cv2.setNumThreads(self.threads_per_job)
+                self._opencv_limited = True
+
+    def try_acquire(self, slots):
+
+        # Non-blocking admit; FairScheduler does the queueing
+        slots = min(slots, self.cpu_budget)
+        with self._lock:
+            if self._in_use + slots > self.cpu_budget:
+                return False
+            self._in_use += slots
+            self._admitted += 1
+            return True
+
+    def release(self, slots):
+
+        slots = min(slots, self.cpu_budget)
+        with self._lock:
+            self._in_use = max(0, self._in_use - slots)
+
+    def job_slots(self, concurrent_stages=1):
+
+        return concurrent_stages * self.threads_per_job
+
+    def status(self):
+
+        with self._lock:
+            return {
+                'cpu_budget': self.cpu_budget,
+                'threads_per_job': self.threads_per_job,
+                'in_use': self._in_use,
+                'saturation': round(self._in_use / self.cpu_budget, 3),
+                'admitted': self._admitted
+            }
@@ -0,0 +1,129 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class FairScheduler:
+
+
+    def __init__(self, governor, latency_window=500):
+
+        # Jobs are dispatched through the governor's CPU budget
+        self.governor = governor
+
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._served_finish = 0.0
+        self._client_finish = defaultdict(float)
+        self._client_weight = {}
+        self._latencies = defaultdict(lambda: deque(maxlen=latency_window))
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+
+    def set_weight(self, client_id, weight):
+
+        with self._condition:
+            self._client_weight[client_id] = max(0.01, float(weight))
+
+    def acquire(self, slots, client_id='', cost=1.0, interactive=False, timeout=None):
+
+        # Weighted fair queuing on virtual time: a job starts where its client's
+        # previous job finished (or now) and is ordered by its finish tag,
+        # start + cost / weight, so cheap jobs and light clients sort ahead of
+        # expensive ones and of a heavy client's backlog
+        job_class = 'interactive' if interactive else 'batch'
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._condition:
+            weight = self._client_weight.get(client_id, 1.0)
+            tag = max(self._virtual_time, self._client_finish[client_id])
+            finish = tag + max(cost, 0.0) / weight
+            self._client_finish[client_id] = finish
+
+            # Interactive jobs always sort before batch jobs
+            entry = (0 if interactive else 1, finish, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+
+            try:
+                while True:
+                    if self._waiting[0] is entry and self.governor.try_acquire(slots):
+                        heapq.heappop(self._waiting)
+                        self._virtual_time = max(self._virtual_time, tag)
+                        self._served_finish = max(self._served_finish, finish)
+                        self._prune_clients()
+                        waited = time.monotonic() - start
+                        self._latencies[job_class].append(waited)
+                        self._admitted += 1
+                        self._total_wait += waited
+                        # The next job in line may also fit in the remaining budget
+                        self._condition.notify_all()
+                        return True
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._waiting.remove(entry)
+                        heapq.heapify(self._waiting)
+                        self._rejected += 1
+                        self._condition.notify_all()
+                        return False
+                    self._condition.wait(remaining if remaining is not None else 1.0)
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                raise
+
+    def release(self, slots):
+
+        self.governor.release(slots)
+        with self._condition:
+            # Once the server drains, every client has been served in full, so
+            # virtual time catches up with the last finish tag handed out
+            if not self._waiting and self.governor.status()['in_use'] == 0:
+                self._virtual_time = max(self._virtual_time, self._served_finish)
+                self._prune_clients()
+            self._condition.notify_all()
+
+    def _prune_clients(self):
+
+        # A client whose last finish tag virtual time has passed would start at
+        # virtual time anyway, so its entry carries no information
+        idle = [client_id for client_id, finish in self._client_finish.items() if finish <= self._virtual_time]
+        for client_id in idle:
+            del self._client_finish[client_id]
+
+    def status(self):
+
+        with self._condition:
+            classes = {}
+            for job_class, samples in self._latencies.items():
+                ordered = sorted(samples)
+                classes[job_class] = {
+                    'samples': len(ordered),
+                    'p50': self._percentile(ordered, 50),
+                    'p95': self._percentile(ordered, 95),
+                    'p99': self._percentile(ordered, 99),
+                }
+            governor = self.governor.status()
+            return {
+                'waiting': len(self._waiting),
+                'saturated': governor['in_use'] >= governor['cpu_budget'] or bool(self._waiting),
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'avg_wait': round(self._total_wait / self._admitted, 4) if self._admitted else 0.0,
+                'tracked_clients': len(self._client_finish),
+                'queue_wait': classes
+            }
+
+    def _percentile(self, ordered, pct):
+
+        if not ordered:
+            return 0.0
+        idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[idx], 4)
@@ -15,7 +15,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Constants
     const MAX_FILE_SIZE = 50 * 1024 * 1024; // 50MB
-    const ALLOWED_EXTENSIONS = ['pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'];
+    const ALLOWED_EXTENSIONS = ['pdf', 'png', 'jpg', 'jpeg', 'tif', 'tiff', 'bmp'];
 
     // Check if all elements exist
     if (!uploadArea || !fileInput || !uploadForm || !submitBtn) {
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# Let the tests import app and the ocr package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    # No Tesseract binary is needed: every call reports one confident word
+    pytesseract = pytest.importorskip('pytesseract')
+    pytest.importorskip('cv2')
+
+    def image_to_data(image, lang='eng', config='', output_type=None):
+        return {
+            'level': [5], 'page_num': [1], 'block_num': [1], 'par_num': [1], 'line_num': [1],
+            'word_num': [1], 'left': [10], 'top': [10], 'width': [80], 'height': [20],
+            'conf': [96], 'text': ['Hello'],
+        }
+
+    monkeypatch.setattr(pytesseract, 'image_to_data', image_to_data)
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda image, lang='eng', config='': 'Hello\n')
+    return pytesseract
+
+
+@pytest.fixture
+def multipage_tiff(tmp_path):
+    from PIL import Image, ImageDraw
+
+    pages = []
+    for i in range(4):
+        page = Image.new('L', (1000, 1000), 255)
+        ImageDraw.Draw(page).text((100, 100 + 40 * i), f"Page {i + 1}", fill=0)
+        pages.append(page)
+    path = tmp_path / 'scan.tiff'
+    pages[0].save(path, save_all=True, append_images=pages[1:], dpi=(300, 300))
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def flask_app(tmp_path_factory):
+    # app configures itself from the environment at import time
+    base = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'UPLOAD_FOLDER': str(base / 'uploads'),
+        'OUTPUT_FOLDER': str(base / 'outputs'),
+        'STATE_FOLDER': str(base / 'state'),
+        'LOG_FILE': str(base / 'app.log'),
+        'OCR_WARMUP': 'false',
+        'START_BACKGROUND_TASKS': 'false',
+        'RATE_LIMIT_ENABLED': 'false',
+        'DEDUP_ENABLED': 'false',
+        'OCR_MODE': 'cascade',
+    })
+    import app
+    app.ocr_engine._tesseract_ready = True
+    return app
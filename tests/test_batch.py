@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+from PIL import Image
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new('L', (1000, 1000), 255).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _wait_for_batch_workers(timeout=30):
+    deadline = time.monotonic() + timeout
+    while any(thread.name.startswith('ThreadPoolExecutor') for thread in threading.enumerate()):
+        assert time.monotonic() < deadline, 'batch workers never finished'
+        time.sleep(0.05)
+
+
+def _indexed_paths(flask_app):
+    rows = flask_app.get_state_db().execute('SELECT path FROM artifacts').fetchall()
+    return {os.path.abspath(path) for (path,) in rows}
+
+
+def test_disconnect_leaves_no_unindexed_outputs(flask_app, fake_tesseract):
+    client = flask_app.app.test_client()
+    image = _png()
+    response = client.post('/batch', data={
+        'format': 'txt',
+        'files': [(io.BytesIO(image), f"scan{i}.png") for i in range(4)],
+    }, buffered=False)
+    assert response.status_code == 200
+
+    # Read one chunk, then hang up
+    next(iter(response.response))
+    response.close()
+    _wait_for_batch_workers()
+
+    output_folder = flask_app.app.config['OUTPUT_FOLDER']
+    on_disk = {os.path.abspath(os.path.join(output_folder, name)) for name in os.listdir(output_folder)}
+    assert on_disk <= _indexed_paths(flask_app)
+    assert flask_app.current_backlog()['active_requests'] == 0
+
+
+def test_batch_refreshes_its_backlog_entry(flask_app):
+    ttl = flask_app.app.config['BACKLOG_ENTRY_TTL']
+    admitted, _ = flask_app.admit_work('long-batch', 100.0)
+    assert admitted
+    db = flask_app.get_state_db()
+    try:
+        # Pretend the batch started long ago, then finished an entry
+        db.execute('UPDATE backlog SET started = ? WHERE id = ?', (time.time() - ttl - 60, 'long-batch'))
+        flask_app.update_work('long-batch', 40.0)
+
+        backlog = flask_app.current_backlog()
+        assert backlog['active_requests'] == 1
+        assert backlog['backlog_seconds'] == pytest.approx(40.0)
+    finally:
+        flask_app.finish_work('long-batch')
+
+
+def test_multi_file_upload_refreshes_its_backlog_entry(flask_app, fake_tesseract, monkeypatch):
+    ttl = flask_app.app.config['BACKLOG_ENTRY_TTL']
+    db = flask_app.get_state_db()
+    process_document = flask_app.ocr_engine.process_document
+    seen = []
+
+    def slow_document(**kwargs):
+        # Each file "takes" longer than the TTL: the entry is aged before the
+        # file runs and must have been refreshed by the time the next one starts
+        seen.append(flask_app.current_backlog()['active_requests'])
+        db.execute('UPDATE backlog SET started = ?', (time.time() - ttl - 60,))
+        return process_document(**kwargs)
+
+    monkeypatch.setattr(flask_app.ocr_engine, 'process_document', slow_document)
+    client = flask_app.app.test_client()
+    image = _png()
+    response = client.post('/upload', data={
+        'format': 'txt',
+        'files': [(io.BytesIO(image), f"page{i}.png") for i in range(3)],
+    })
+    assert response.status_code == 200
+    assert seen == [1, 1, 1]
+    assert flask_app.current_backlog()['active_requests'] == 0
+
+
+def test_failing_entry_is_reported_in_the_manifest(flask_app, fake_tesseract, monkeypatch):
+    process_document = flask_app.ocr_engine.process_document
+
+    def flaky_document(**kwargs):
+        if kwargs['input_path'].endswith('broken.png'):
+            raise RuntimeError('decoder crashed')
+        return process_document(**kwargs)
+
+    monkeypatch.setattr(flask_app.ocr_engine, 'process_document', flaky_document)
+    client = flask_app.app.test_client()
+    image = _png()
+    response = client.post('/batch', data={
+        'format': 'txt',
+        'files': [(io.BytesIO(image), name) for name in ('good1.png', 'broken.png', 'good2.png')],
+    })
+    assert response.status_code == 200
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as zf:
+        manifest = json.loads(zf.read('manifest.json'))
+        names = set(zf.namelist())
+    entries = {entry['original_filename']: entry for entry in manifest['files']}
+    assert entries['broken.png']['success'] is False
+    assert 'decoder crashed' in entries['broken.png']['error']
+    assert manifest['successful'] == 2
+    assert {'good1.txt', 'good2.txt'} <= names
+    assert flask_app.current_backlog()['active_requests'] == 0
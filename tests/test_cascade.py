@@ -0,0 +1,21 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from PIL import Image
+
+from ocr.ocr_engine import OCREngine
+
+
+def test_cascade_pages_keep_layout_blocks(fake_tesseract):
+    engine = OCREngine(mode='cascade')
+    engine._tesseract_ready = True
+    page = Image.fromarray(np.full((1000, 1000), 255, dtype=np.uint8))
+
+    page_data = engine._recognize_page(engine._preprocess_page((1, page)))
+
+    # Same blocks as full mode would parse from the same Tesseract output
+    expected = engine.layout_parser.parse_layout(fake_tesseract.image_to_data(None))
+    assert len(expected) == 1
+    assert page_data['blocks'] == expected
+    assert all(isinstance(conf, int) for conf in page_data['data']['conf'])
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pytest
+
+from ocr.checkpoint import CheckpointStore
+
+
+def _page(page_num):
+    return {'page_num': page_num, 'text': f"page {page_num}", 'blocks': [], 'tables': [], 'data': {}}
+
+
+def test_checkpoints_survive_until_last_holder_releases(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    first = store.hold('doc')
+    second = store.hold('doc')
+    store.save('doc', _page(1))
+
+    store.release('doc', first, clear=True)
+    assert list(store.load('doc')) == [1]
+
+    store.release('doc', second, clear=True)
+    assert not os.path.exists(tmp_path / 'doc')
+
+
+def test_failed_job_keeps_checkpoints_for_resume(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    token = store.hold('doc')
+    store.save('doc', _page(3))
+    store.release('doc', token, clear=False)
+    assert list(store.load('doc')) == [3]
+
+
+def test_concurrent_saves_of_the_same_page(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    errors = []
+
+    def writer():
+        try:
+            for _ in range(50):
+                store.save('doc', _page(1))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert os.listdir(tmp_path / 'doc') == ['page_0001.json']
+
+
+@pytest.mark.parametrize('output_format', ['txt', 'pdf'])
+def test_concurrent_jobs_on_the_same_file(tmp_path, fake_tesseract, multipage_tiff, output_format):
+    from ocr.ocr_engine import OCREngine
+
+    # Cascade mode skips the slow preprocessing for the stub's confident words
+    engine = OCREngine(checkpoint_folder=str(tmp_path / 'checkpoints'), mode='cascade')
+    engine._tesseract_ready = True
+    results = []
+
+    def job(file_id):
+        results.append(engine.process_document(
+            multipage_tiff, output_format, str(tmp_path), file_id=file_id
+        ))
+
+    threads = [threading.Thread(target=job, args=(f"job{i}",)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [result['success'] for result in results] == [True, True], results
+    assert all(result['pages'] == 4 for result in results)
+    assert os.listdir(tmp_path / 'checkpoints') == []
@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr.dedup import PageDedupIndex
+from ocr.ocr_engine import OCREngine
+
+
+def _font(size):
+    for path in ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'DejaVuSans.ttf', 'arial.ttf'):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+def _binarized_page(text, size):
+    # A 300 DPI A4 page, thresholded the way full-mode preprocessing leaves it
+    page = Image.new('L', (2480, 3508), 255)
+    ImageDraw.Draw(page).text((300, 600), text, fill=0, font=_font(size))
+    return np.where(np.asarray(page) > 127, 255, 0).astype(np.uint8)
+
+
+@pytest.mark.parametrize('first, second', [
+    ('Total 1,000', 'Total 1.000'),
+    ('Pay 100', 'Pay 100.'),
+])
+@pytest.mark.parametrize('size', [34, 42])
+def test_near_miss_pages_are_not_duplicates(first, second, size):
+    index = PageDedupIndex()
+    index.add(index.fingerprint(_binarized_page(first, size)), 'eng:full', {'text': first})
+
+    assert index.lookup(index.fingerprint(_binarized_page(second, size)), 'eng:full') is None
+    assert index.lookup(index.fingerprint(_binarized_page(first, size)), 'eng:full') == {'text': first}
+
+
+def test_same_content_different_shape_is_not_a_duplicate():
+    index = PageDedupIndex()
+    blank = np.full((800, 1000), 255, dtype=np.uint8)
+    index.add(index.fingerprint(blank), 'eng:full', {'text': ''})
+    assert index.lookup(index.fingerprint(np.full((1000, 800), 255, dtype=np.uint8)), 'eng:full') is None
+    assert index.lookup(index.fingerprint(blank.copy()), 'eng:full') is not None
+
+
+def test_reused_result_takes_the_current_page_geometry(fake_tesseract):
+    engine = OCREngine(dedup_index=PageDedupIndex(), mode='cascade')
+    engine._tesseract_ready = True
+    page = np.full((1000, 1200), 255, dtype=np.uint8)
+
+    first = Image.fromarray(page)
+    first.info['dpi'] = (300, 300)
+    second = Image.fromarray(page)
+    second.info['dpi'] = (150, 150)
+
+    original = engine._recognize_page(engine._preprocess_page((1, first)))
+    reused = engine._recognize_page(engine._preprocess_page((2, second)))
+
+    assert reused['deduplicated'] and reused['page_num'] == 2
+    assert (reused['width'], reused['height']) == (1200, 1000)
+    assert reused['dpi'] == 150 and original['dpi'] == 300
@@ -0,0 +1,45 @@
+import io
+import zipfile
+
+import pytest
+
+docx = pytest.importorskip('docx')
+
+from ocr.ocr_engine import OCREngine
+
+
+# Ragged rows: short, long (truncated to max_cols), empty, non-string and tab-bearing cells
+ROWS = [
+    ['Item', 'Qty', 'Price'],
+    ['Widget', 3],
+    ['Gadget', 12, '4.50', 'overflow'],
+    [],
+    ['Tab\tcell', '', 7.25],
+]
+MAX_COLS = 3
+
+
+def _document_xml(fill):
+    doc = docx.Document()
+    table = doc.add_table(rows=len(ROWS), cols=MAX_COLS)
+    table.style = 'Light Grid Accent 1'
+    fill(table)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as archive:
+        return archive.read('word/document.xml')
+
+
+def _fill_with_cell_text(table):
+    # The writer this replaced
+    for i, row_data in enumerate(ROWS):
+        for j, cell_text in enumerate(row_data):
+            if j < MAX_COLS:
+                table.rows[i].cells[j].text = str(cell_text)
+
+
+def test_fill_docx_table_matches_cell_text_writer():
+    engine = OCREngine()
+    fast = _document_xml(lambda table: engine._fill_docx_table(table, ROWS, MAX_COLS))
+    reference = _document_xml(_fill_with_cell_text)
+    assert fast == reference
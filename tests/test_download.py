@@ -0,0 +1,81 @@
+import gzip
+import os
+
+import pytest
+
+BODY = ('Hello world\n' * 200).encode('utf-8')
+
+
+@pytest.fixture
+def output_file(flask_app):
+    name = 'download_test.txt'
+    path = os.path.join(flask_app.app.config['OUTPUT_FOLDER'], name)
+    with open(path, 'wb') as f:
+        f.write(BODY)
+    flask_app.register_artifact(path, 'output')
+    flask_app.precompress_output(path)
+    yield name
+    flask_app.remove_artifact(path)
+    flask_app.remove_artifact(f"{path}.gz")
+
+
+def test_conditional_request_is_not_modified(flask_app, output_file):
+    client = flask_app.app.test_client()
+    first = client.get(f'/download/{output_file}')
+    assert first.status_code == 200
+    assert first.data == BODY
+    assert first.headers['ETag']
+
+    again = client.get(f'/download/{output_file}', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+def test_range_request_returns_partial_content(flask_app, output_file):
+    client = flask_app.app.test_client()
+    response = client.get(f'/download/{output_file}', headers={'Range': 'bytes=6-10'})
+    assert response.status_code == 206
+    assert response.data == BODY[6:11]
+    assert response.headers['Content-Range'] == f'bytes 6-10/{len(BODY)}'
+
+
+def test_gzip_variant_has_its_own_etag(flask_app, output_file):
+    client = flask_app.app.test_client()
+    plain = client.get(f'/download/{output_file}')
+    packed = client.get(f'/download/{output_file}', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert packed.status_code == 200
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed.data) == BODY
+    assert packed.headers['ETag'] != plain.headers['ETag']
+    for response in (plain, packed):
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert 'private' in response.headers['Cache-Control']
+
+    # A gzip ETag revalidates the gzip variant only
+    again = client.get(f'/download/{output_file}', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': packed.headers['ETag']
+    })
+    assert again.status_code == 304
+    assert client.get(f'/download/{output_file}', headers={'If-None-Match': packed.headers['ETag']}).status_code == 200
+
+
+def test_nginx_offload_sends_accel_redirect(flask_app, output_file, monkeypatch):
+    monkeypatch.setitem(flask_app.app.config, 'DOWNLOAD_OFFLOAD', 'nginx')
+    monkeypatch.setitem(flask_app.app.config, 'DOWNLOAD_ACCEL_PREFIX', '/protected-outputs/')
+    client = flask_app.app.test_client()
+
+    response = client.get(f'/download/{output_file}')
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f'/protected-outputs/{output_file}'
+    assert output_file in response.headers['Content-Disposition']
+
+    packed = client.get(f'/download/{output_file}', headers={'Accept-Encoding': 'gzip'})
+    assert packed.headers['X-Accel-Redirect'] == f'/protected-outputs/{output_file}.gz'
+    assert packed.headers['Content-Encoding'] == 'gzip'
+
+
+def test_missing_file_is_not_found(flask_app):
+    response = flask_app.app.test_client().get('/download/no_such_output.txt')
+    assert response.status_code == 404
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only load when OCR work (or a given output format) needs them
+HEAVY_MODULES = ('cv2', 'numpy', 'pytesseract', 'pdf2image', 'docx', 'openpyxl')
+
+# Seconds; measured around 0.2s, overridable for slow CI machines
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', 1.0))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _import_in_subprocess(module, cwd):
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        OCR_WARMUP='false',
+        START_BACKGROUND_TASKS='false',
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', ['ocr.ocr_engine', 'app'])
+def test_import_is_light(module, tmp_path):
+    # Run from a scratch directory so app's upload/output/state folders land there
+    probe = _import_in_subprocess(module, tmp_path)
+    assert probe['loaded'] == []
+    assert probe['elapsed'] < IMPORT_TIME_BUDGET, f"import {module} took {probe['elapsed']:.2f}s"
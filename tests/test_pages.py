@@ -0,0 +1,57 @@
+import io
+
+import pytest
+from PIL import Image
+
+from ocr.ocr_engine import OCREngine
+
+
+@pytest.fixture
+def mpo_jpeg(tmp_path):
+    # Camera JPEGs often carry a second (preview) frame that Pillow opens as MPO
+    path = tmp_path / 'photo.jpg'
+    frames = [Image.new('RGB', (800, 600), 'white'), Image.new('RGB', (160, 120), 'gray')]
+    frames[0].save(path, format='MPO', save_all=True, append_images=frames[1:])
+    with Image.open(path) as image:
+        assert image.format == 'MPO' and image.n_frames == 2
+    return str(path)
+
+
+def test_multipage_tiff_is_streamed_frame_by_frame(multipage_tiff):
+    engine = OCREngine()
+    assert engine._count_pages(multipage_tiff) == 4
+    assert engine.estimate_cost(multipage_tiff)['pages'] == 4
+
+    pages = list(engine._iter_pages(multipage_tiff, 4, skip_pages={2}))
+    assert [page_num for page_num, _ in pages] == [1, 3, 4]
+    assert all(frame.mode == 'L' for _, frame in pages)
+
+
+def test_other_multiframe_images_are_one_page(mpo_jpeg):
+    engine = OCREngine()
+    assert engine._count_pages(mpo_jpeg) == 1
+    assert engine.estimate_cost(mpo_jpeg)['pages'] == 1
+    assert [page_num for page_num, _ in engine._iter_pages(mpo_jpeg, 1)] == [1]
+
+
+@pytest.mark.parametrize('fixture, interactive', [('multipage_tiff', False), ('mpo_jpeg', True)])
+def test_interactive_priority_needs_a_single_page(flask_app, monkeypatch, request, fixture, interactive):
+    path = request.getfixturevalue(fixture)
+    seen = {}
+
+    def process_document(**kwargs):
+        seen['interactive'] = kwargs['interactive']
+        return {'success': False, 'error': 'stub'}
+
+    monkeypatch.setattr(flask_app.ocr_engine, 'process_document', process_document)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    name = 'scan.tiff' if fixture == 'multipage_tiff' else 'photo.jpg'
+    client = flask_app.app.test_client()
+    client.post('/upload', data={
+        'format': 'txt',
+        'priority': 'interactive',
+        'files': [(io.BytesIO(data), name)],
+    })
+    assert seen['interactive'] is interactive
@@ -0,0 +1,39 @@
+import io
+
+import pytest
+from PIL import Image
+
+from ocr.pdf_writer import SearchablePDFWriter
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('L', (width, height), 255).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def test_searchable_pdf_parses_strictly(tmp_path):
+    pypdf = pytest.importorskip('pypdf')
+    path = tmp_path / 'out.pdf'
+
+    writer = SearchablePDFWriter(str(path))
+    # A4 portrait at 300 dpi, then a landscape page whose boxes are in a larger image's pixels
+    writer.add_page(_jpeg(248, 351), 248, 351, 595.2, 842.4, [
+        ('Invoice', (100, 100, 700, 180)),
+        ('Привет', (100, 300, 600, 380)),
+    ], box_size=(2480, 3510))
+    writer.add_page(_jpeg(400, 300), 400, 300, 288.0, 216.0, [('Total', (20, 20, 120, 50))])
+    writer.close()
+
+    reader = pypdf.PdfReader(str(path), strict=True)
+    assert len(reader.pages) == 2
+    assert [float(v) for v in reader.pages[0].mediabox] == pytest.approx([0, 0, 595.2, 842.4])
+    assert [float(v) for v in reader.pages[1].mediabox] == pytest.approx([0, 0, 288.0, 216.0])
+
+    first = reader.pages[0].extract_text()
+    assert 'Invoice' in first and 'Привет' in first
+    assert 'Total' in reader.pages[1].extract_text()
+
+    descriptor = reader.pages[0]['/Resources']['/Font']['/F1']['/DescendantFonts'][0].get_object()['/FontDescriptor']
+    font_file = descriptor['/FontFile2'].get_object()
+    assert font_file.get_data()[:4] == b'\x00\x01\x00\x00'
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from ocr.resources import ResourceGovernor
+from ocr.scheduler import FairScheduler
+
+
+def _wait_for_waiting(scheduler, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while scheduler.status()['waiting'] < count:
+        assert time.monotonic() < deadline, 'jobs never queued'
+        time.sleep(0.005)
+
+
+def _run_queued(scheduler, jobs):
+    # Hold the only slot, queue every job in order, then release and record dispatch order
+    order = []
+    scheduler.acquire(1)
+
+    def job(name, kwargs):
+        scheduler.acquire(1, **kwargs)
+        order.append(name)
+        scheduler.release(1)
+
+    threads = []
+    for idx, (name, kwargs) in enumerate(jobs, 1):
+        thread = threading.Thread(target=job, args=(name, kwargs))
+        thread.start()
+        threads.append(thread)
+        _wait_for_waiting(scheduler, idx)
+
+    scheduler.release(1)
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def test_cheaper_job_runs_first_across_new_clients():
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=1))
+    order = _run_queued(scheduler, [
+        ('A', {'client_id': 'a', 'cost': 500}),
+        ('B', {'client_id': 'b', 'cost': 1}),
+    ])
+    assert order == ['B', 'A']
+
+
+def test_heavy_client_backlog_does_not_starve_others():
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=1))
+    order = _run_queued(scheduler, [
+        ('A1', {'client_id': 'a', 'cost': 10}),
+        ('A2', {'client_id': 'a', 'cost': 10}),
+        ('A3', {'client_id': 'a', 'cost': 10}),
+        ('B1', {'client_id': 'b', 'cost': 10}),
+    ])
+    assert order.index('B1') < order.index('A2')
+
+
+def test_interactive_jobs_go_first():
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=1))
+    order = _run_queued(scheduler, [
+        ('batch', {'client_id': 'a', 'cost': 1}),
+        ('interactive', {'client_id': 'b', 'cost': 50, 'interactive': True}),
+    ])
+    assert order == ['interactive', 'batch']
+
+
+def test_load_scenario_reports_per_class_percentiles():
+    # A batch client floods the queue while interactive uploads trickle in
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=2))
+
+    def job(client_id, cost, interactive):
+        scheduler.acquire(1, client_id=client_id, cost=cost, interactive=interactive)
+        time.sleep(cost / 1000)
+        scheduler.release(1)
+
+    threads = [threading.Thread(target=job, args=('batch-client', 20, False)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for i in range(8):
+        time.sleep(0.01)
+        thread = threading.Thread(target=job, args=(f"user-{i}", 2, True))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join(10)
+
+    queue_wait = scheduler.status()['queue_wait']
+    assert queue_wait['batch']['samples'] == 20
+    assert queue_wait['interactive']['samples'] == 8
+    assert queue_wait['interactive']['p95'] < queue_wait['batch']['p95']
+
+
+def test_timeouts_and_waits_are_reported():
+    governor = ResourceGovernor(cpu_budget=1)
+    scheduler = FairScheduler(governor)
+    scheduler.acquire(1)
+
+    threads = [
+        threading.Thread(target=scheduler.acquire, args=(1,), kwargs={'client_id': f"c{i}", 'timeout': 0.2})
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    _wait_for_waiting(scheduler, 3)
+    status = scheduler.status()
+    assert status['waiting'] == 3 and status['saturated']
+
+    for thread in threads:
+        thread.join(5)
+    status = scheduler.status()
+    assert status['waiting'] == 0
+    assert status['rejected'] == 3
+    assert status['admitted'] == 1
+    scheduler.release(1)
+
+
+def test_idle_clients_are_forgotten():
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=1))
+    for i in range(50):
+        assert scheduler.acquire(1, client_id=f"10.0.0.{i}", cost=5)
+        scheduler.release(1)
+    assert scheduler.status()['tracked_clients'] == 0
+
+
+def test_client_weight_shifts_the_order():
+    scheduler = FairScheduler(ResourceGovernor(cpu_budget=1))
+    scheduler.set_weight('partner', 10)
+    order = _run_queued(scheduler, [
+        ('regular', {'client_id': 'regular', 'cost': 10}),
+        ('partner', {'client_id': 'partner', 'cost': 50}),
+    ])
+    assert order == ['partner', 'regular']
@@ -0,0 +1,72 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from PIL import Image
+
+from ocr.ocr_engine import OCREngine
+
+XHTML = '{http://www.w3.org/1999/xhtml}'
+
+
+@pytest.fixture
+def page_data(fake_tesseract, monkeypatch):
+    # The fake Tesseract page plus a second word that needs escaping
+    def image_to_data(image, lang='eng', config='', output_type=None):
+        return {
+            'level': [5, 5], 'page_num': [1, 1], 'block_num': [1, 1], 'par_num': [1, 1], 'line_num': [1, 1],
+            'word_num': [1, 2], 'left': [10, 100], 'top': [10, 12], 'width': [80, 60], 'height': [20, 22],
+            'conf': [96, 88.6], 'text': ['Hello', '<R&D>'],
+        }
+
+    monkeypatch.setattr(fake_tesseract, 'image_to_data', image_to_data)
+    engine = OCREngine(mode='cascade')
+    engine._tesseract_ready = True
+    page = Image.fromarray(np.full((1200, 1000), 255, dtype=np.uint8))
+    return engine, engine._recognize_page(engine._preprocess_page((1, page)))
+
+
+def test_jsonl_has_boxes_and_confidences(page_data, tmp_path):
+    engine, page = page_data
+    path = tmp_path / 'out.jsonl'
+    engine._generate_jsonl([page], str(path))
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record['page'] == 1
+    assert (record['width'], record['height']) == (1000, 1200)
+
+    [block] = record['blocks']
+    [line] = block['lines']
+    assert line['text'] == 'Hello <R&D>'
+    assert [(word['text'], word['bbox'], word['conf']) for word in line['words']] == [
+        ('Hello', [10, 10, 90, 30], 96),
+        ('<R&D>', [100, 12, 160, 34], 89),
+    ]
+    assert line['bbox'] == [10, 10, 160, 34]
+    assert block['bbox'] == [10, 10, 160, 34]
+
+
+def test_hocr_is_well_formed_and_escaped(page_data, tmp_path):
+    engine, page = page_data
+    path = tmp_path / 'out.hocr'
+    engine._generate_hocr([page], str(path))
+
+    raw = path.read_text(encoding='utf-8')
+    assert '&lt;R&amp;D&gt;' in raw
+
+    root = ET.fromstring(raw.encode('utf-8'))
+    [ocr_page] = [div for div in root.iter(f'{XHTML}div') if div.get('class') == 'ocr_page']
+    assert ocr_page.get('title') == 'bbox 0 0 1000 1200; ppageno 0'
+
+    words = [span for span in root.iter(f'{XHTML}span') if span.get('class') == 'ocrx_word']
+    assert [(span.text, span.get('title')) for span in words] == [
+        ('Hello', 'bbox 10 10 90 30; x_wconf 96'),
+        ('<R&D>', 'bbox 100 12 160 34; x_wconf 89'),
+    ]
+    [line] = [span for span in root.iter(f'{XHTML}span') if span.get('class') == 'ocr_line']
+    assert line.get('title') == 'bbox 10 10 160 34'